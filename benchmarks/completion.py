@@ -0,0 +1,70 @@
+"""
+Benchmark of the search suggestions index (SuggestionIndex),
+with 100k distinct terms: latency of completions for random
+prefixes (1 to 4 characters), and loading time of the cache file.
+
+Run from the repository root:
+    python benchmarks/completion.py
+"""
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from history import History
+from suggestions import SuggestionIndex
+
+ENTRIES = 100_000
+QUERIES = 10_000
+LIMIT = 10
+LATENCY_BUDGET = 0.005
+ALPHABET = "abcdefghijklmnopqrstuvwxyz "
+
+
+def make_terms(count: int) -> dict[str, float]:
+    generator = random.Random(42)
+    scores: dict[str, float] = {}
+    while len(scores) < count:
+        terms = "".join(generator.choice(ALPHABET) for _ in range(generator.randint(4, 30))).strip()
+        scores[terms] = generator.expovariate(1.0)
+    return scores
+
+
+def percentile(values: list[float], percent: float) -> float:
+    return statistics.quantiles(values, n=100)[int(percent) - 1]
+
+
+def main() -> int:
+    index = SuggestionIndex.from_scores(make_terms(ENTRIES))
+    generator = random.Random(7)
+    latencies: list[float] = []
+    for _ in range(QUERIES):
+        prefix = "".join(generator.choice(ALPHABET[:-1]) for _ in range(generator.randint(1, 4)))
+        start = time.perf_counter()
+        index.complete(prefix, LIMIT)
+        latencies.append(time.perf_counter() - start)
+
+    with tempfile.TemporaryDirectory() as root:
+        history = History(Path(root) / "history.jsonl")
+        file = Path(root) / "suggestions.tsv"
+        index.save(history, file)
+        start = time.perf_counter()
+        loaded = SuggestionIndex.load(history, file)
+        load_time = time.perf_counter() - start
+        assert len(loaded) == len(index)
+
+    p99 = percentile(latencies, 99)
+    print(f"entries: {len(index)}, queries: {QUERIES}, limit: {LIMIT}")
+    print(f"p50: {percentile(latencies, 50) * 1000:.3f} ms")
+    print(f"p99: {p99 * 1000:.3f} ms (budget: {LATENCY_BUDGET * 1000:.0f} ms)")
+    print(f"max: {max(latencies) * 1000:.3f} ms")
+    print(f"cache load: {load_time * 1000:.1f} ms")
+    return 0 if p99 < LATENCY_BUDGET else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,96 @@
+"""
+Benchmark comparing the resolution of browser executables
+using which() for every browser, against a single scan of
+the $PATH directories (ExecutableIndex), and against the
+policy of the executables cache: searching $PATH for every
+executable up to INDEX_THRESHOLD browsers, indexing it above.
+
+Run from the repository root:
+    python benchmarks/executables.py
+"""
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from shutil import which
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from entries.executable import INDEX_THRESHOLD, ExecutableIndex, search_path
+
+FILES_PER_DIRECTORY = 100
+PATH_LENGTHS = [5, 20, 50]
+CATALOG_SIZES = [15, 25, 50, 200]
+REPEAT = 5
+
+
+def make_path(root: Path, length: int) -> list[str]:
+    directories: list[str] = []
+    for i in range(length):
+        directory = root / f"bin{i}"
+        directory.mkdir()
+        for j in range(FILES_PER_DIRECTORY):
+            file = directory / f"tool{i}-{j}"
+            file.touch()
+            file.chmod(0o755)
+        directories.append(str(directory))
+    # Only the last directory contains an installed browser
+    browser = Path(directories[-1]) / "browser0"
+    browser.touch()
+    browser.chmod(0o755)
+    return directories
+
+
+def best_of(function) -> float:
+    timings: list[float] = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def resolve_with_which(catalog: list[str], path: str):
+    for executable in catalog:
+        which(executable, path=path)
+
+
+def resolve_with_index(catalog: list[str], directories: list[str]):
+    index = ExecutableIndex(directories)
+    for executable in catalog:
+        index.which(executable)
+
+
+def resolve_with_cache(catalog: list[str], directories: list[str]):
+    if len(catalog) > INDEX_THRESHOLD:
+        resolve_with_index(catalog, directories)
+        return
+    for executable in catalog:
+        search_path(executable, directories)
+
+
+def main():
+    column_string = "{:>12}{:>10}{:>14}{:>14}{:>10}{:>14}"
+    print(column_string.format("PATH-LENGTH", "BROWSERS", "WHICH (ms)", "INDEX (ms)", "SPEEDUP", "CACHE (ms)"))
+    for length in PATH_LENGTHS:
+        with tempfile.TemporaryDirectory() as root:
+            directories = make_path(Path(root), length)
+            path = os.pathsep.join(directories)
+            for size in CATALOG_SIZES:
+                catalog = [f"browser{i}" for i in range(size)]
+                with_which = best_of(lambda: resolve_with_which(catalog, path))
+                with_index = best_of(lambda: resolve_with_index(catalog, directories))
+                with_cache = best_of(lambda: resolve_with_cache(catalog, directories))
+                print(column_string.format(
+                    length,
+                    size,
+                    f"{with_which * 1000:.2f}",
+                    f"{with_index * 1000:.2f}",
+                    f"{with_which / with_index:.1f}x",
+                    f"{with_cache * 1000:.2f}"
+                ))
+
+
+if __name__ == '__main__':
+    main()
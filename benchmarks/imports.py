@@ -0,0 +1,120 @@
+"""
+Regression check of the import cost of the fast paths of rofi-search,
+measured with `python -X importtime`:
+- hotkey: a launch without arguments, with a cached configuration
+  (rofi is replaced by benchmarks/fakes/rofi, closing the menu at once)
+- script call: the handling of a call of the rofi script, done for every action in the menu
+
+For every path, the total import time (median of several runs) must stay under a
+fixed budget, and the rarely used modules must not be imported at all.
+It also checks that the default arguments of the fast path match the parser
+(both are derived from cli.OPTIONS, this guards the derivation).
+
+Run from the repository root:
+    python benchmarks/imports.py
+"""
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+FAKES = ROOT / "benchmarks" / "fakes"
+sys.path.insert(0, str(ROOT))
+
+from cli import DEFAULT_ARGUMENTS, get_arguments
+
+RUNS = 10
+# Total import time (in seconds) of a fast path, including the standard library modules it imports
+# (about 25 ms for the hotkey, with a margin for noisy machines: the lazy modules are checked separately)
+IMPORT_BUDGET = 0.045
+# Only needed to parse arguments, read configuration files, report errors or create the configuration
+LAZY_MODULES = {"argparse", "tomllib", "difflib", "shutil", "concurrent.futures"}
+
+CONFIG = f"""\
+[customization]
+frontend = "{FAKES / 'rofi'}"
+"""
+
+# Name, extra environment variables
+PATHS: list[tuple[str, dict[str, str]]] = [
+    ("hotkey", {}),
+    ("script call", {"ROFI_RETV": "0", "ROFI_SEARCH_ARGUMENTS": "[]"}),
+]
+
+
+def get_imports(environment: dict[str, str]) -> dict[str, float]:
+    """
+    :return: The import time (in seconds, excluding its own imports) of every module imported by rofi-search,
+    after the startup of the interpreter (which ends with the import of site).
+    """
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", str(ROOT / "main.py")],
+        env=environment,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True
+    )
+    imports: dict[str, float] = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_time, _, name = line.removeprefix("import time:").split("|")
+        if name == " site":
+            imports.clear()
+            continue
+        imports[name.strip()] = int(self_time) / 1e6
+    return imports
+
+
+def main() -> int:
+    failures: list[str] = []
+    defaults = vars(get_arguments().parse_args([]))
+    if defaults != DEFAULT_ARGUMENTS:
+        failures.append(f"cli.DEFAULT_ARGUMENTS does not match the defaults of the parser: {defaults}")
+
+    home = Path(tempfile.mkdtemp(prefix="rofi-search-imports-"))
+    (home / ".config" / "rofi-search").mkdir(parents=True)
+    (home / ".config" / "rofi-search" / "config.toml").write_text(CONFIG)
+    (home / "steps.json").write_text("[]")
+    environment = dict(
+        os.environ,
+        HOME=str(home),
+        XDG_CONFIG_HOME=str(home / ".config"),
+        XDG_CACHE_HOME=str(home / "cache"),
+        XDG_STATE_HOME=str(home / "state"),
+        FAKE_ROFI_STEPS=str(home / "steps.json"),
+        FAKE_ROFI_LOG=str(home / "rofi.jsonl")
+    )
+    # The bytecode cache is part of a normal launch
+    environment.pop("PYTHONDONTWRITEBYTECODE", None)
+    for variable in ("ROFI_RETV", "ROFI_SEARCH_ARGUMENTS", "ROFI_SEARCH_TRACE"):
+        environment.pop(variable, None)
+
+    column_string = "{:<14}{:>10}{:>16}"
+    print(column_string.format("PATH", "MODULES", "IMPORTS (ms)"))
+    try:
+        # Fills the configuration and bytecode caches
+        get_imports(environment)
+        for name, variables in PATHS:
+            runs = [get_imports(dict(environment, **variables)) for _ in range(RUNS)]
+            total = statistics.median(sum(imports.values()) for imports in runs)
+            print(column_string.format(name, len(runs[0]), f"{total * 1000:.1f}"))
+            if total > IMPORT_BUDGET:
+                failures.append(f"{name}: imports take {total * 1000:.1f} ms, over the budget of {IMPORT_BUDGET * 1000:.0f} ms")
+            loaded = LAZY_MODULES.intersection(runs[0])
+            if len(loaded) != 0:
+                failures.append(f"{name}: imports {', '.join(sorted(loaded))}")
+    finally:
+        shutil.rmtree(home, ignore_errors=True)
+
+    for failure in failures:
+        print(f"Failed: {failure}", file=sys.stderr)
+    return 1 if len(failures) != 0 else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
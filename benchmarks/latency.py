@@ -0,0 +1,197 @@
+"""
+End-to-end benchmark of the menus, without a display: rofi is replaced by a fake
+replaying the keypresses of a scripted flow (benchmarks/fakes/rofi), and the
+browser by a fake recording the URLs it is started with (benchmarks/fakes/browser).
+
+For every flow and backend, it measures the keypress-to-URL latency: the time
+between the last keypress and the start of the browser, and checks that the
+browser was started with the expected URL.
+It also checks that a browser exiting at once with an error is reported,
+even though it is started in the background.
+
+Run from the repository root:
+    python benchmarks/latency.py
+    python benchmarks/latency.py --output latency.json
+"""
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from argparse import ArgumentParser
+from pathlib import Path
+from typing import Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+FAKES = ROOT / "benchmarks" / "fakes"
+BACKENDS = ["script", "dmenu"]
+RUNS = 10
+# Time (in seconds) to wait for the detached fake browser to be started
+LAUNCH_TIMEOUT = 2
+# Exit code of rofi-search when the browser cannot be started (main.ExitCode.BROWSER_ERROR)
+BROWSER_ERROR = 4
+
+CONFIG = f"""\
+[browsers]
+preferred = ["Fake"]
+
+[search_engines]
+default = "DuckDuckGo"
+
+[customization]
+frontend = "{FAKES / 'rofi'}"
+
+[browser.fake]
+name = "Fake"
+executable = "{FAKES / 'browser'}"
+base = "Firefox"
+
+[browser.other]
+name = "Other Fake"
+executable = "{FAKES / 'browser'}"
+base = "Chromium"
+"""
+
+# Name, keypresses, part of the expected URL
+FLOWS: list[tuple[str, list[dict], str]] = [
+    ("search", [{"input": "cats"}], "duckduckgo.com/?q=cats"),
+    ("aliases", [{"input": "!yt cats"}], "youtube.com/results?search_query=cats"),
+    ("browsers menu", [{"code": 10}, {"row": 0}, {"input": "cats"}], "duckduckgo.com/?q=cats"),
+    ("search engines menu", [{"code": 11}, {"row": 0}, {"input": "cats"}], "cats"),
+    ("private toggle", [{"code": 12}, {"input": "cats"}], "duckduckgo.com/?q=cats"),
+    ("languages menu", [{"code": 13}, {"row": 0}, {"input": "cats"}], "q=cats"),
+]
+
+
+def read_log(file: Path) -> list[dict]:
+    if not file.exists():
+        return []
+    with open(file, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def wait_for_launch(browser_log: Path):
+    """
+    Waits for the browser to write its log, as it is started detached and may still be starting when rofi-search exits.
+    """
+    deadline = time.monotonic() + LAUNCH_TIMEOUT
+    while time.monotonic() < deadline and len(read_log(browser_log)) == 0:
+        time.sleep(0.005)
+
+
+def run_flow(home: Path, backend: str, steps: list[dict]) -> tuple[Optional[float], list[str], int]:
+    """
+    Runs rofi-search once, replaying the given keypresses.
+    :return: The keypress-to-URL latency (None if the browser was not started), the browser arguments and the exit code.
+    """
+    steps_file, rofi_log, browser_log = home / "steps.json", home / "rofi.jsonl", home / "browser.jsonl"
+    steps_file.write_text(json.dumps(steps))
+    rofi_log.unlink(missing_ok=True)
+    browser_log.unlink(missing_ok=True)
+    environment = dict(
+        os.environ,
+        HOME=str(home),
+        XDG_CONFIG_HOME=str(home / "config"),
+        XDG_CACHE_HOME=str(home / "cache"),
+        XDG_STATE_HOME=str(home / "state"),
+        FAKE_ROFI_STEPS=str(steps_file),
+        FAKE_ROFI_LOG=str(rofi_log),
+        FAKE_BROWSER_LOG=str(browser_log)
+    )
+    environment.pop("ROFI_RETV", None)
+    process = subprocess.run(
+        [sys.executable, str(ROOT / "main.py"), "--configuration-file", str(home / "config.toml"), "--backend", backend],
+        env=environment,
+        stdout=subprocess.DEVNULL
+    )
+    wait_for_launch(browser_log)
+    keypresses, launches = read_log(rofi_log), read_log(browser_log)
+    if len(keypresses) == 0 or len(launches) == 0:
+        return None, [], process.returncode
+    return launches[0]["time"] - keypresses[-1]["time"], launches[0]["argv"], process.returncode
+
+
+def check_failing_browser(home: Path) -> Optional[str]:
+    """
+    Searches with a detached browser exiting at once with an error.
+    :return: The failure, if rofi-search did not report it.
+    """
+    browser = home / "failing-browser"
+    browser.write_text("#!/bin/sh\nexit 3\n")
+    browser.chmod(0o755)
+    config = home / "failing.toml"
+    config.write_text(f'[browsers]\npreferred = ["Failing"]\n\n[browser.failing]\nname = "Failing"\nexecutable = "{browser}"\nbase = "Firefox"\n')
+    for _ in range(RUNS):
+        process = subprocess.run(
+            [sys.executable, str(ROOT / "main.py"), "--configuration-file", str(config), "--detach", "--terms", "cats"],
+            env=dict(os.environ, HOME=str(home), XDG_CACHE_HOME=str(home / "cache"), XDG_STATE_HOME=str(home / "state")),
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            text=True
+        )
+        if process.returncode != BROWSER_ERROR or "exited with code 3" not in process.stderr:
+            return f"failing browser: exit code {process.returncode}, {process.stderr.strip()!r}"
+    return None
+
+
+def percentile(values: list[float], percent: int) -> float:
+    if len(values) < 2:
+        return values[0]
+    return statistics.quantiles(values, n=100)[percent - 1]
+
+
+def main() -> int:
+    parser = ArgumentParser(description="Measures the keypress-to-URL latency of rofi-search, with a fake rofi and browser.")
+    parser.add_argument("--output", "-o", type=Path, help="File to write the results to, as JSON.")
+    parser.add_argument("--runs", type=int, default=RUNS, help="Number of runs of every flow.")
+    args = parser.parse_args()
+
+    home = Path(tempfile.mkdtemp(prefix="rofi-search-latency-"))
+    (home / "config.toml").write_text(CONFIG)
+    results: dict[str, dict] = {}
+    failures: list[str] = []
+    column_string = "{:<22}{:>8}{:>14}{:>14}"
+    print(column_string.format("FLOW", "BACKEND", "P50 (ms)", "P95 (ms)"))
+    try:
+        for name, steps, expected in FLOWS:
+            for backend in BACKENDS:
+                latencies: list[float] = []
+                for _ in range(args.runs):
+                    latency, argv, exit_code = run_flow(home, backend, steps)
+                    if latency is None or exit_code != 0 or not any(expected in argument for argument in argv):
+                        failures.append(f"{name} ({backend}): exit code {exit_code}, browser arguments {argv}")
+                        break
+                    latencies.append(latency)
+                if len(latencies) == 0:
+                    continue
+                results[f"{name}.{backend}"] = {
+                    "unit": "s",
+                    "runs": len(latencies),
+                    "p50": percentile(latencies, 50),
+                    "p95": percentile(latencies, 95),
+                    "max": max(latencies),
+                }
+                print(column_string.format(
+                    name,
+                    backend,
+                    f"{results[f'{name}.{backend}']['p50'] * 1000:.1f}",
+                    f"{results[f'{name}.{backend}']['p95'] * 1000:.1f}"
+                ))
+        failure = check_failing_browser(home)
+        if failure is not None:
+            failures.append(failure)
+    finally:
+        shutil.rmtree(home, ignore_errors=True)
+
+    for failure in failures:
+        print(f"Failed: {failure}", file=sys.stderr)
+    if args.output is not None:
+        args.output.write_text(json.dumps({"results": results, "failures": failures}, indent=2) + "\n")
+    return 1 if len(failures) != 0 else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,68 @@
+"""
+Benchmark of the menu state machine (Application.run), without rofi:
+a long session of switching menus, selecting rows and toggling privacy
+is replayed, measuring the cost of every transition and the memory used,
+which must not grow with the length of the session.
+
+Run from the repository root:
+    python benchmarks/menus.py
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from subprocess import CompletedProcess
+
+HOME = Path(tempfile.mkdtemp(prefix="rofi-search-benchmark-"))
+# Must be set before importing the application, as it resolves its directories at import
+os.environ.update(HOME=str(HOME), XDG_CACHE_HOME=str(HOME / "cache"), XDG_STATE_HOME=str(HOME / "state"), XDG_CONFIG_HOME=str(HOME / "config"))
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from cli import get_arguments
+from main import Application, ExitCode, load_config
+
+SESSION_LENGTHS = [1_000, 10_000, 100_000]
+# (exit code, output) of rofi: browsers menu, toggle privacy, back, search engines menu,
+# select the first one, languages menu, select the first one
+CYCLE = [(10, b""), (12, b""), (1, b""), (11, b""), (0, b"0\n"), (13, b""), (0, b"0\n")]
+
+
+class ReplayedApplication(Application):
+
+    def __init__(self, *args, transitions: int, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.transitions = transitions
+        self.shown = 0
+
+    def make_menu(self, prompt, message, entries=None, **kwargs) -> CompletedProcess:
+        self.shown += 1
+        if self.shown > self.transitions:
+            return CompletedProcess([], 1, b"", b"")
+        return_code, output = CYCLE[(self.shown - 1) % len(CYCLE)]
+        return CompletedProcess([], return_code, output, b"")
+
+
+def main():
+    config = load_config(get_arguments().parse_args([]))
+    column_string = "{:>12}{:>16}{:>18}"
+    print(column_string.format("TRANSITIONS", "PER STEP (us)", "PEAK MEMORY (KiB)"))
+    for transitions in SESSION_LENGTHS:
+        app = ReplayedApplication(config, transitions=transitions)
+        tracemalloc.start()
+        start = time.perf_counter()
+        exit_code = app.run()
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        assert exit_code == ExitCode.SUCCESS, exit_code
+        print(column_string.format(transitions, f"{elapsed / transitions * 1e6:.2f}", f"{peak / 1024:.1f}"))
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    finally:
+        shutil.rmtree(HOME, ignore_errors=True)
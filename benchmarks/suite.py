@@ -0,0 +1,280 @@
+"""
+Benchmark suite of rofi-search, runnable offline.
+It measures:
+- the cold and warm startup of main.py (without and with the bytecode and configuration caches)
+- load_config, with a realistic and a synthetic (many custom entries) configuration file
+- BrowserConfiguration.get_all and SearchEngineConfiguration.get_all (memoized), and their filtering (filter_all)
+- the generation of the menus payload (Entry.get_entry)
+- the throughput of SearchEngine.format_url
+
+The results are written as JSON, and can be compared with the results of another commit.
+The user configuration, caches and state are redirected to a temporary directory,
+so the benchmarks neither depend on nor modify the ones of the user.
+
+Run from the repository root:
+    python benchmarks/suite.py --output before.json
+    python benchmarks/suite.py --output after.json --compare before.json
+"""
+import atexit
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from argparse import ArgumentParser
+from pathlib import Path
+from typing import Callable, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+RUNS = 20
+STARTUP_RUNS = 10
+SYNTHETIC_ENTRIES = 200
+URLS = 10_000
+ALIASES_COLOR = "#8839ef"
+WORDS = ["python", "rofi", "search", "café", "a&b", "how to", "c++", "100%", "linux", "wayland"]
+
+REALISTIC_CONFIG = """\
+[main]
+lang = "fr"
+private_search = false
+
+[browsers]
+preferred = ["Firefox", "Brave"]
+hide = ["Opera"]
+
+[search_engines]
+default = "DuckDuckGo"
+additional = ["Wikipedia"]
+hide = ["Bing", "aol", "Ask"]
+
+[customization]
+aliases_color = "#8839ef"
+kb_browsers = "Alt+b"
+width = 40
+
+[history]
+size = 10
+
+[browser.work]
+name = "Work"
+executable = "firefox"
+base = "Firefox"
+aliases = ["w"]
+arguments = ["-P", "work"]
+
+[search_engine.wikipedia]
+name = "Wikipedia"
+url = "https://{lang}.wikipedia.org/w/index.php"
+aliases = ["wiki", "w"]
+field = "search"
+escape = true
+"""
+
+
+def make_synthetic_config(count: int) -> str:
+    sections = [
+        "[browsers]",
+        f"hide = {json.dumps([f'Browser {i}' for i in range(0, count, 2)])}",
+        "[search_engines]",
+        f"hide = {json.dumps([f'Engine {i}' for i in range(0, count, 2)])}",
+    ]
+    for i in range(count):
+        sections.extend([
+            f"[browser.browser{i}]",
+            f'name = "Browser {i}"',
+            f'executable = "browser{i}"',
+            'base = "Firefox"',
+            f'aliases = ["b{i}", "browser{i}"]',
+            f"[search_engine.engine{i}]",
+            f'name = "Engine {i}"',
+            f'url = "https://{{lang}}.engine{i}.example/search"',
+            f'aliases = ["e{i}", "engine{i}"]',
+            "escape = true",
+        ])
+    return "\n".join(sections) + "\n"
+
+
+def get_environment(home: Path) -> dict[str, str]:
+    return {
+        "HOME": str(home),
+        "XDG_CONFIG_HOME": str(home / "config"),
+        "XDG_CACHE_HOME": str(home / "cache"),
+        "XDG_STATE_HOME": str(home / "state"),
+    }
+
+
+def summarize(timings: list[float], **extra) -> dict:
+    return {
+        "unit": "s",
+        "runs": len(timings),
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "mean": statistics.fmean(timings),
+        **extra
+    }
+
+
+def measure(function: Callable[[], object], runs: int = RUNS, setup: Optional[Callable[[], object]] = None) -> list[float]:
+    timings: list[float] = []
+    for _ in range(runs):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def run_main(argv: list[str], environment: dict[str, str]):
+    # --debug also prints the executables cache statistics to stderr
+    subprocess.run([sys.executable, str(ROOT / "main.py"), *argv], env=environment, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+
+
+def benchmark_startup(home: Path, config_file: Path) -> dict[str, dict]:
+    argv = ["--debug", "--terms", "benchmark", "--configuration-file", str(config_file)]
+    base_environment = dict(os.environ, **get_environment(home))
+    base_environment.pop("PYTHONDONTWRITEBYTECODE", None)
+
+    def cold_setup():
+        # No bytecode nor configuration/executables cache
+        shutil.rmtree(home / "cache", ignore_errors=True)
+        shutil.rmtree(home / "pycache", ignore_errors=True)
+
+    environment = dict(base_environment, PYTHONPYCACHEPREFIX=str(home / "pycache"))
+    cold = measure(lambda: run_main(argv, environment), STARTUP_RUNS, cold_setup)
+    run_main(argv, environment)
+    warm = measure(lambda: run_main(argv, environment), STARTUP_RUNS)
+    return {
+        "startup.cold": summarize(cold),
+        "startup.warm": summarize(warm),
+    }
+
+
+def benchmark_load_config(name: str, config_file: Path) -> dict[str, dict]:
+    from cli import get_arguments
+    from config.cache import CONFIG_CACHE_FILE
+    from main import load_config
+
+    args = get_arguments().parse_args(["--configuration-file", str(config_file)])
+    uncached = measure(lambda: load_config(args), setup=lambda: CONFIG_CACHE_FILE.unlink(missing_ok=True))
+    load_config(args)
+    cached = measure(lambda: load_config(args))
+    return {
+        f"load_config.{name}.uncached": summarize(uncached),
+        f"load_config.{name}.cached": summarize(cached),
+    }
+
+
+def benchmark_menus(name: str, config_file: Path) -> dict[str, dict]:
+    from cli import get_arguments
+    from main import load_config
+
+    config = load_config(get_arguments().parse_args(["--configuration-file", str(config_file)]))
+    browsers = config.browsers.get_all()
+    search_engines = config.search_engines.get_all()
+    return {
+        f"get_all.{name}.browsers": summarize(measure(config.browsers.get_all), entries=len(config.browsers.registry)),
+        f"get_all.{name}.search_engines": summarize(measure(config.search_engines.get_all), entries=len(config.search_engines.registry)),
+        f"filter_all.{name}.browsers": summarize(measure(config.browsers.filter_all), entries=len(config.browsers.registry)),
+        f"filter_all.{name}.search_engines": summarize(measure(config.search_engines.filter_all), entries=len(config.search_engines.registry)),
+        f"get_entry.{name}": summarize(
+            measure(lambda: "\n".join(entry.get_entry(ALIASES_COLOR) for entry in [*browsers, *search_engines])),
+            entries=len(browsers) + len(search_engines)
+        ),
+    }
+
+
+def benchmark_format_url() -> dict[str, dict]:
+    from entries.search_engine import SEARCH_ENGINES
+
+    generator = random.Random(42)
+    terms_list = [" ".join(generator.choices(WORDS, k=generator.randint(1, 5))) for _ in range(URLS)]
+    search_engines = list(SEARCH_ENGINES.values())
+
+    def format_all():
+        for search_engine in search_engines:
+            for terms in terms_list:
+                search_engine.format_url(terms, "en")
+
+    timings = measure(format_all, runs=5)
+    urls = URLS * len(search_engines)
+    return {
+        "format_url": summarize(timings, urls=urls, urls_per_second=urls / min(timings)),
+    }
+
+
+def get_commit() -> Optional[str]:
+    try:
+        process = subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return process.stdout.strip()
+
+
+def compare(results: dict[str, dict], previous: dict[str, dict]):
+    column_string = "{:<40}{:>14}{:>14}{:>10}"
+    print(column_string.format("BENCHMARK", "BEFORE (ms)", "AFTER (ms)", "RATIO"))
+    for name, result in results.items():
+        if name not in previous:
+            continue
+        before, after = previous[name]["median"], result["median"]
+        print(column_string.format(name, f"{before * 1000:.3f}", f"{after * 1000:.3f}", f"{after / before:.2f}x"))
+
+
+def main() -> int:
+    parser = ArgumentParser(description="Runs the benchmarks of rofi-search and writes the results as JSON.")
+    parser.add_argument("--output", "-o", type=Path, help="File to write the results to (printed if not given).")
+    parser.add_argument("--compare", type=Path, help="Results of a previous run, to compare the medians with.")
+    parser.add_argument("--skip-startup", action="store_true", help="Skips the (slower) startup benchmarks.")
+    args = parser.parse_args()
+
+    results: dict[str, dict] = {}
+    with tempfile.TemporaryDirectory(prefix="rofi-search-benchmark-") as directory:
+        home = Path(directory)
+        # Must be set before importing the application, as it resolves its directories at import
+        os.environ.update(get_environment(home))
+        from entries.executable import EXECUTABLES
+
+        configs = {
+            "realistic": home / "realistic.toml",
+            "synthetic": home / "synthetic.toml",
+        }
+        configs["realistic"].write_text(REALISTIC_CONFIG)
+        configs["synthetic"].write_text(make_synthetic_config(SYNTHETIC_ENTRIES))
+        try:
+            if not args.skip_startup:
+                results.update(benchmark_startup(home, configs["realistic"]))
+            # Before loading any configuration, to only format the URLs of the built-in search engines
+            results.update(benchmark_format_url())
+            for name, config_file in configs.items():
+                results.update(benchmark_load_config(name, config_file))
+                results.update(benchmark_menus(name, config_file))
+        finally:
+            # The executables cache would be saved at exit, in the removed directory
+            atexit.unregister(EXECUTABLES.save)
+
+    report = {
+        "commit": get_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "time": time.time(),
+        "results": results,
+    }
+    if args.output is not None:
+        args.output.write_text(json.dumps(report, indent=2) + "\n")
+    else:
+        print(json.dumps(report, indent=2))
+    if args.compare is not None:
+        compare(results, json.loads(args.compare.read_text())["results"])
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
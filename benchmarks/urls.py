@@ -0,0 +1,71 @@
+"""
+Benchmark of the formatting of search URLs: the previous implementation
+(regex match, str.format and urlencode on every call), against the
+precompiled templates of SearchEngine, one URL at a time (format_url)
+and in bulk (format_urls).
+
+Run from the repository root:
+    python benchmarks/urls.py
+"""
+import random
+import sys
+import time
+from pathlib import Path
+from urllib import parse
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from entries.search_engine import NEEDS_LANGUAGE_REGEX, SEARCH_ENGINES, SearchEngine
+
+TERMS = 10_000
+REPEAT = 5
+LANGUAGE = "en"
+WORDS = ["python", "rofi", "search", "café", "a&b", "how to", "c++", "100%", "linux", "wayland"]
+
+
+def make_terms(count: int) -> list[str]:
+    generator = random.Random(42)
+    return [" ".join(generator.choices(WORDS, k=generator.randint(1, 5))) for _ in range(count)]
+
+
+def format_url_uncompiled(search_engine: SearchEngine, terms: str, lang: str) -> str:
+    url = search_engine.get_url()
+    if NEEDS_LANGUAGE_REGEX.match(url):
+        url = url.format(lang=lang)
+    if search_engine.escape:
+        query_string = parse.urlencode({search_engine.field: terms})
+    else:
+        query_string = f"{search_engine.field}={terms}"
+    return f"{url}?{query_string}"
+
+
+def best_of(function) -> float:
+    timings: list[float] = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    terms_list = make_terms(TERMS)
+    column_string = "{:>22}{:>18}{:>18}{:>18}"
+    print(f"{TERMS} search terms, best of {REPEAT}")
+    print(column_string.format("SEARCH ENGINE", "UNCOMPILED (ms)", "FORMAT_URL (ms)", "FORMAT_URLS (ms)"))
+    for search_engine in SEARCH_ENGINES.values():
+        expected = [format_url_uncompiled(search_engine, terms, LANGUAGE) for terms in terms_list]
+        assert list(search_engine.format_urls(terms_list, LANGUAGE)) == expected, search_engine
+        uncompiled = best_of(lambda: [format_url_uncompiled(search_engine, terms, LANGUAGE) for terms in terms_list])
+        single = best_of(lambda: [search_engine.format_url(terms, LANGUAGE) for terms in terms_list])
+        bulk = best_of(lambda: list(search_engine.format_urls(terms_list, LANGUAGE)))
+        print(column_string.format(
+            search_engine.get_name(),
+            f"{uncompiled * 1000:.2f}",
+            f"{single * 1000:.2f}",
+            f"{bulk * 1000:.2f}"
+        ))
+
+
+if __name__ == '__main__':
+    main()
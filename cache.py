@@ -0,0 +1,49 @@
+"""
+File containing the location of the cache and state directories,
+as well as some helpers to read and write their (JSON) files.
+
+Cache files are only an optimization: any of them can be
+deleted at any time, and a cache file that cannot be read
+is treated as if it did not exist.
+State files (e.g. usage statistics) are kept separately,
+as they cannot be rebuilt.
+"""
+import json
+import os
+from pathlib import Path
+from typing import Any, Optional
+
+XDG_CACHE_DIR = Path(os.getenv("XDG_CACHE_HOME") or Path.home() / ".cache")
+APP_CACHE_DIR = XDG_CACHE_DIR / "rofi-search"
+XDG_STATE_DIR = Path(os.getenv("XDG_STATE_HOME") or Path.home() / ".local" / "state")
+APP_STATE_DIR = XDG_STATE_DIR / "rofi-search"
+
+
+def read_cache(file: Path) -> Optional[Any]:
+    """
+    Reads a JSON cache file.
+    :param file: The path to the cache file.
+    :return: The decoded content of the file, or None if it does not exist or is corrupted.
+    """
+    try:
+        with file.open("r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_cache(file: Path, data: Any):
+    """
+    Atomically writes a JSON cache file, creating the cache directory if needed.
+    Errors are silently ignored, as the cache is only an optimization.
+    :param file: The path to the cache file.
+    :param data: The JSON serializable data to write.
+    """
+    temporary = file.with_name(f".{file.name}.{os.getpid()}")
+    try:
+        file.parent.mkdir(parents=True, exist_ok=True)
+        with temporary.open("w", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(temporary, file)
+    except OSError:
+        temporary.unlink(missing_ok=True)
@@ -1,123 +1,215 @@
-from argparse import ArgumentParser
+"""
+File containing the command line arguments of rofi-search.
+
+The parser is only built when arguments are given: a launch without
+arguments (from a hotkey, or a call of the rofi script) gets their
+default values directly, without importing argparse nor listing the
+browsers and search engines for the choices. Both are derived from the
+same table of options, so that they can't diverge.
+"""
 from pathlib import Path
+from types import SimpleNamespace
+from typing import TYPE_CHECKING, Any, Optional
+
+if TYPE_CHECKING:
+    from argparse import ArgumentParser, Namespace
+
+# Placeholders for the choices of the options, replaced when the parser is built,
+# as listing them imports the browsers, search engines and configuration
+BROWSER_NAMES = "browser names"
+SEARCH_ENGINE_NAMES = "search engine names"
+BACKEND_NAMES = "backend names"
+
+# Options of the parser: argument group (None for the main options), flags and parameters of add_argument
+OPTIONS: list[tuple[Optional[str], tuple[str, ...], dict[str, Any]]] = [
+    # Main options
+    (None, ("--terms", "-t"), {"nargs": "+"}),
+    (None, ("--batch",), {
+        "metavar": "FILE",
+        "help": "Searches every line of the file ('-' for stdin), which may start with aliases (e.g. '!yt cats'), opening URLs in as few browser commands as possible."
+    }),
+    (None, ("--configuration-file", "--configuration", "--config", "--config-file", "-c"), {
+        "type": Path,
+        "help": "Path to the TOML configuration file."
+    }),
+    (None, ("--debug", "--fake-run", "-d"), {
+        "action": "store_true",
+        "help": "Prints the Browser to be opened and the URL to open then exits."
+    }),
+    (None, ("--language", "--locale", "--lang"), {
+        "help": "Sets the language or locale tu use with the search engine."
+    }),
+    (None, ("--list-browsers",), {
+        "action": "store_true",
+        "help": "Lists all the supported browsers."
+    }),
+    (None, ("--list-search-engines",), {
+        "action": "store_true",
+        "help": "Lists all the supported search engines."
+    }),
+    (None, ("--private-search", "--private", "-p"), {
+        "action": "store_true",
+        "help": "Opens the link in a private tab/window."
+    }),
+    (None, ("--detach",), {
+        "action": "store_true",
+        "help": "Starts the browser in the background and exits immediately. Default when using the rofi menu."
+    }),
+    (None, ("--wait",), {
+        "action": "store_true",
+        "help": "Waits for the browser to exit when using the rofi menu, instead of starting it in the background."
+    }),
+    (None, ("--complete",), {
+        "metavar": "PREFIX",
+        "help": "Prints the past search terms starting with the given prefix, most frequent and recent first."
+    }),
+    (None, ("--daemon",), {
+        "action": "store_true",
+        "help": "Runs in the background, keeping the configuration loaded, to answer requests from the client (client.py)."
+    }),
+    (None, ("--trace",), {
+        "nargs": "?",
+        "const": "-",
+        "metavar": "FILE",
+        "help": "Writes the duration of every phase (imports, configuration, rofi, browser...) as JSON lines, to stderr or to the given file. Can also be enabled with the ROFI_SEARCH_TRACE environment variable."
+    }),
+    (None, ("--stats",), {
+        "action": "store_true",
+        "help": "Prints the percentiles of the duration of the main phases (startup, configuration, first menu, browser start) of the past launches."
+    }),
+    (None, ("--make-init-config", "--init-config", "--init"), {
+        "action": "store_true",
+        "help": "Creates a new (commented) configuration file in the user's configuration directory. Recommended for first time users."
+    }),
+
+    # Browser options
+    ("browser", ("--preferred-browsers", "--preferred-browser", "--browsers", "--browser", "-b"), {
+        "choices": BROWSER_NAMES,
+        "nargs": "+",
+        "help": "Sets the preferred browser(s) to use (comma separated)."
+    }),
+    ("browser", ("--private-browsers-only", "--private-browsers", "-B"), {
+        "action": "store_true",
+        "default": None,
+        "help": "Filters to show only browsers that respects your privacy."
+    }),
+    ("browser", ("--show-browsers",), {
+        "choices": BROWSER_NAMES,
+        "nargs": "+",
+        "help": "Shows the given browsers (comma separated). Overrides all other options."
+    }),
+    ("browser", ("--hide-browsers",), {
+        "choices": BROWSER_NAMES,
+        "nargs": "+",
+        "help": "Hides the given browsers (comma separated). Overrides all other options."
+    }),
+    ("browser", ("--show-browsers-based-on", "--show-based-on", "--show-based"), {
+        "choices": BROWSER_NAMES,
+        "nargs": "+",
+        "help": "Show the browsers based on a certain browser."
+    }),
+    ("browser", ("--hide-browsers-based-on", "--hide-based-on", "--hide-based"), {
+        "choices": BROWSER_NAMES,
+        "nargs": "+",
+        "help": "Hides the browsers based on a certain browser."
+    }),
+
+    # Search engine options
+    ("search engine", ("--default-search-engine", "--search-engine", "-s"), {
+        "choices": SEARCH_ENGINE_NAMES,
+        "action": "append",
+        "help": "Sets the default search engine to use. Repeat to also search on other search engines, in other tabs."
+    }),
+    ("search engine", ("--private-search-engine-only", "--private-search-engines", "-S"), {
+        "action": "store_true",
+        "default": None,
+        "help": "Filters to show only search engines that respects your privacy."
+    }),
+    ("search engine", ("--hide-search-engines",), {
+        "choices": SEARCH_ENGINE_NAMES,
+        "nargs": "+",
+        "help": "Hides the given search engines (comma separated). Overrides all other options."
+    }),
+    ("search engine", ("--show-search-engines",), {
+        "choices": SEARCH_ENGINE_NAMES,
+        "nargs": "+",
+        "help": "Shows the given search engines (comma separated). Overrides all other options."
+    }),
+
+    # Customization
+    ("customization", ("--aliases-color",), {"help": "Sets to use for aliases in pango color format (hex or color name)."}),
+    ("customization", ("--kb-browsers",), {"help": "Sets the keybinding to open the browser list."}),
+    ("customization", ("--kb-change-language",), {"help": "Sets the keybinding to open the language list."}),
+    ("customization", ("--kb-search-engines",), {"help": "Sets the keybinding to open the search engine list."}),
+    ("customization", ("--kb-add-search-engine",), {"help": "Sets the keybinding to add/remove a search engine to search on at the same time (in the search engine list)."}),
+    ("customization", ("--kb-toggle-private-search", "--kb-toggle-private"), {"help": "Sets the keybinding to toggle the private search.."}),
+    ("customization", ("--rofi-config",), {"help": "Path to a rofi configuration file to use instead of the default one."}),
+    ("customization", ("--backend",), {
+        "choices": BACKEND_NAMES,
+        "help": "Sets how menus are displayed: in a single rofi process (script) or in one rofi process per menu (dmenu)."
+    }),
+    ("customization", ("--frontend",), {"help": "Executable used to show the menus, instead of rofi (or wofi on Wayland)."}),
+    ("customization", ("--width", "-w"), {"type": int, "help": "Sets the width of the search bar (in %% of display width)."}),
+
+    # History
+    ("history", ("--history-size",), {"type": int, "help": "Sets the number of past searches to show in the search menu (0 to hide them)."}),
+]
+
+
+def get_default(flags: tuple[str, ...], parameters: dict[str, Any]) -> tuple[str, Any]:
+    """
+    :return: The name of the attribute of the option and its value when it is not given, as set by argparse.
+    """
+    destination = next(flag for flag in flags if flag.startswith("--")).removeprefix("--").replace("-", "_")
+    if "default" in parameters:
+        return destination, parameters["default"]
+    return destination, False if parameters.get("action") == "store_true" else None
+
+
+# Values of the arguments when none are given
+DEFAULT_ARGUMENTS: dict[str, Any] = dict(get_default(flags, parameters) for _, flags, parameters in OPTIONS)
+
+PARSER: Optional['ArgumentParser'] = None
+
+
+def make_arguments() -> 'ArgumentParser':
+    from argparse import ArgumentParser
+
+    from config.config import BACKENDS
+    from entries.browser import BROWSERS
+    from entries.search_engine import SEARCH_ENGINES
+
+    choices = {
+        BROWSER_NAMES: sorted(BROWSERS.keys()),
+        SEARCH_ENGINE_NAMES: sorted(SEARCH_ENGINES.keys()),
+        BACKEND_NAMES: BACKENDS,
+    }
+
+    arguments = ArgumentParser("rofi-search")
+    arguments.add_argument("--version", "-v", action="version", version="%(prog)s 1.0.0")
+    groups = {None: arguments}
+    for group, flags, parameters in OPTIONS:
+        if group not in groups:
+            groups[group] = arguments.add_argument_group(group)
+        if "choices" in parameters:
+            parameters = dict(parameters, choices=choices[parameters["choices"]])
+        groups[group].add_argument(*flags, **parameters)
+    arguments.add_subparsers()
+    return arguments
+
+
+def get_arguments() -> 'ArgumentParser':
+    global PARSER
+    if PARSER is None:
+        PARSER = make_arguments()
+    return PARSER
+
 
-from entries.browser import Browser
-from entries.search_engine import SearchEngine
-
-browser_names = sorted(Browser.all.keys())
-search_engine_names = sorted(SearchEngine.all.keys())
-
-# Main options
-arguments = ArgumentParser("rofi-search")
-arguments.add_argument("--version", "-v", action="version", version="%(prog)s 1.0.0")
-arguments.add_argument("--terms", "-t", nargs="+")
-arguments.add_argument(
-    "--configuration-file", "--configuration", "--config", "--config-file", "-c",
-    type=Path,
-    help="Path to the TOML configuration file."
-)
-arguments.add_argument(
-    "--debug", "--fake-run", "-d",
-    action="store_true",
-    help="Prints the Browser to be opened and the URL to open then exits."
-)
-arguments.add_argument(
-    "--language", "--locale", "--lang",
-    help="Sets the language or locale tu use with the search engine."
-)
-arguments.add_argument(
-    "--list-browsers",
-    action="store_true",
-    help="Lists all the supported browsers."
-)
-arguments.add_argument(
-    "--list-search-engines",
-    action="store_true",
-    help="Lists all the supported search engines."
-)
-arguments.add_argument(
-    "--private-search", "--private", "-p",
-    action="store_true",
-    help="Opens the link in a private tab/window."
-)
-arguments.add_argument(
-    "--make-init-config", "--init-config", "--init",
-    action="store_true",
-    help="Creates a new (commented) configuration file in the user's configuration directory. Recommended for first time users."
-)
-arguments.add_subparsers()
-
-# Browser options
-browser = arguments.add_argument_group("browser")
-browser.add_argument(
-    "--preferred-browsers", "--preferred-browser", "--browsers", "--browser", "-b",
-    choices=browser_names,
-    nargs='+',
-    help="Sets the preferred browser(s) to use (comma separated)."
-)
-browser.add_argument(
-    "--private-browsers-only", "--private-browsers", "-B",
-    action="store_true",
-    default=None,
-    help="Filters to show only browsers that respects your privacy."
-)
-browser.add_argument(
-    "--show-browsers",
-    choices=browser_names,
-    nargs='+',
-    help="Shows the given browsers (comma separated). Overrides all other options."
-)
-browser.add_argument(
-    "--hide-browsers",
-    choices=browser_names,
-    nargs='+',
-    help="Hides the given browsers (comma separated). Overrides all other options."
-)
-browser.add_argument(
-    "--show-browsers-based-on", "--show-based-on", "--show-based",
-    choices=browser_names,
-    nargs='+',
-    help="Show the browsers based on a certain browser."
-)
-browser.add_argument(
-    "--hide-browsers-based-on", "--hide-based-on", "--hide-based",
-    choices=browser_names,
-    nargs='+',
-    help="Hides the browsers based on a certain browser."
-)
-
-# Search engine options
-search_engine = arguments.add_argument_group("search engine")
-search_engine.add_argument(
-    "--default-search-engine", "--search-engine", "-s",
-    choices=search_engine_names,
-    help="Sets the default search engine to use."
-)
-search_engine.add_argument(
-    "--private-search-engine-only", "--private-search-engines", "-S",
-    action="store_true",
-    default=None,
-    help="Filters to show only search engines that respects your privacy."
-)
-search_engine.add_argument(
-    "--hide-search-engines",
-    choices=search_engine_names,
-    nargs='+',
-    help="Hides the given search engines (comma separated). Overrides all other options."
-)
-search_engine.add_argument(
-    "--show-search-engines",
-    choices=search_engine_names,
-    nargs='+',
-    help="Shows the given search engines (comma separated). Overrides all other options."
-)
-
-# Customization
-customization = arguments.add_argument_group("customization")
-customization.add_argument("--aliases-color", help="Sets to use for aliases in pango color format (hex or color name).")
-customization.add_argument("--kb-browsers", help="Sets the keybinding to open the browser list.")
-customization.add_argument("--kb-change-language", help="Sets the keybinding to open the language list.")
-customization.add_argument("--kb-search-engines", help="Sets the keybinding to open the search engine list.")
-customization.add_argument("--kb-toggle-private-search", "--kb-toggle-private", help="Sets the keybinding to toggle the private search..")
-customization.add_argument("--rofi-config", help="Path to a rofi configuration file to use instead of the default one.")
-customization.add_argument("--width", "-w", type=int, help="Sets the width of the search bar (in %% of display width).")
\ No newline at end of file
+def parse_arguments(argv: list[str]) -> tuple['Namespace', list[str]]:
+    """
+    :param argv: The command line arguments.
+    :return: The parsed arguments and the unknown ones.
+    """
+    if len(argv) == 0:
+        return SimpleNamespace(**DEFAULT_ARGUMENTS), []
+    return get_arguments().parse_known_args(argv)
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Thin client for the rofi-search daemon (see rofi-search --daemon).
+
+It only imports a few standard modules, sends its arguments,
+environment and standard file descriptors to the daemon, and
+exits with the exit code sent back by the daemon.
+If no daemon is running, or if the daemon cannot handle the request
+(e.g. the configuration it reloads is invalid), it falls back to
+running rofi-search in this process.
+
+Protocol: the client connects to the Unix socket and sends one
+line of JSON ({"args": [...], "cwd": "...", "env": {...}}) with
+its stdin, stdout and stderr attached (SCM_RIGHTS). The daemon
+answers with the exit code, or "fallback", followed by a newline.
+
+As the request hands over the environment and the terminal of the
+client, the client only talks to a daemon run by the same user,
+listening on a socket owned by the user. Without $XDG_RUNTIME_DIR,
+the socket is kept in a directory of /tmp only the user can write to.
+"""
+import json
+import os
+import socket
+import struct
+import sys
+from typing import Optional
+
+# Answer of the daemon when the client must run the request by itself
+FALLBACK_RESPONSE = b"fallback\n"
+
+
+# Credentials of the process at the other end of a Unix socket (pid, uid, gid)
+PEER_CREDENTIALS = struct.Struct("3i")
+
+
+def get_socket_directory() -> str:
+    runtime_dir = os.getenv("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return runtime_dir
+    return f"/tmp/rofi-search-{os.getuid()}"
+
+
+def get_socket_path() -> str:
+    return os.path.join(get_socket_directory(), "rofi-search.sock")
+
+
+def is_trusted(client: 'socket.socket', path: str) -> bool:
+    """
+    :return: Whether the socket and the daemon listening on it belong to the user.
+    """
+    _, uid, _ = PEER_CREDENTIALS.unpack(client.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, PEER_CREDENTIALS.size))
+    return uid == os.getuid() and os.stat(path).st_uid == os.getuid()
+
+
+def request(args: list[str]) -> Optional[int]:
+    """
+    Sends a request to the daemon.
+    :param args: The command line arguments to run the request with.
+    :return: The exit code of the request, or None if it must be run in this process
+    (no daemon of the user is running, the daemon asked for it or closed the connection before answering).
+    """
+    path = get_socket_path()
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.connect(path)
+        trusted = is_trusted(client, path)
+    except OSError:
+        trusted = False
+    if not trusted:
+        client.close()
+        return None
+    with client:
+        message = json.dumps({"args": args, "cwd": os.getcwd(), "env": dict(os.environ)}) + "\n"
+        response = b""
+        try:
+            socket.send_fds(client, [message.encode()], [0, 1, 2])
+            while not response.endswith(b"\n"):
+                chunk = client.recv(64)
+                if len(chunk) == 0:
+                    return None
+                response += chunk
+        except ConnectionError:
+            return None
+    if response == FALLBACK_RESPONSE:
+        return None
+    try:
+        return int(response)
+    except ValueError:
+        return None
+
+
+if __name__ == '__main__':
+    exit_code = request(sys.argv[1:])
+    if exit_code is None:
+        sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+        import main
+        exit_code = main.main()
+    sys.exit(exit_code)
@@ -1,3 +1,5 @@
 from .config import Configuration, ConfigurationException
-from .location import ConfigLocation, APP_XDG_CONFIG_DIR, APP_XDG_CONFIG_FILE, APP_DOT_DIR, APP_DOT_FILE, XDG_CONFIG_DIR, get_user_config
+from .location import ConfigLocation, UserConfig, APP_XDG_CONFIG_DIR, APP_XDG_CONFIG_FILE, APP_DOT_DIR, APP_DOT_FILE, XDG_CONFIG_DIR, FILESYSTEM_CALLS, find_user_config
 from .parsing import GlobalConfigParser, ConfigParsingException
+from .sources import SourceGraph
+from .cache import get_cached_user_config, load_cached_configuration, read_configuration_cache, save_configuration_cache
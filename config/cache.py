@@ -0,0 +1,198 @@
+"""
+File containing the compiled configuration cache.
+
+Once every configuration file has been parsed and merged,
+the resulting configuration (including custom browsers and
+search engines) is stored in a cache file, along with the
+path, size and modification time of every file that contributed
+to it. As long as none of these files change, the configuration
+is restored from the cache without parsing any TOML file.
+
+The location of the user configuration is cached too, with the
+fingerprints of the directories listed to find it: as long as none of
+them change, no directory needs to be listed again.
+"""
+from pathlib import Path
+from typing import Any, Iterable, Optional
+
+from cache import APP_CACHE_DIR, read_cache, write_cache
+from entries.browser import Browser
+from entries.search_engine import SearchEngine
+
+from .config import Configuration
+from .location import UserConfig, get_fingerprint
+
+CONFIG_CACHE_FILE = APP_CACHE_DIR / "config.json"
+CONFIG_CACHE_VERSION = 6
+
+
+def get_names(entries: Iterable['Browser | SearchEngine']) -> list[str]:
+    return [entry.get_name() for entry in entries]
+
+
+def dump_browser(browser: 'Browser') -> dict[str, Any]:
+    return {
+        "name": browser.get_name(),
+        "executable": browser.get_executable(),
+        "aliases": browser.get_aliases(),
+        "arguments": browser.get_arguments(),
+        "private_arguments": browser.private_arguments,
+        "private": browser.is_private(),
+        "base": browser.get_base().get_name() if browser.get_base() is not None else None,
+        "search_engine": browser.get_search_engine().get_name() if browser.get_search_engine() is not None else None,
+        "max_urls": browser.get_max_urls()
+    }
+
+
+def dump_search_engine(search_engine: 'SearchEngine') -> dict[str, Any]:
+    return {
+        "name": search_engine.get_name(),
+        "url": search_engine.get_url(),
+        "aliases": search_engine.get_aliases(),
+        "private": search_engine.is_private(),
+        "field": search_engine.field,
+        "escape": search_engine.escape
+    }
+
+
+def dump_configuration(config: 'Configuration') -> dict[str, Any]:
+    return {
+        "files": [str(file) for file in config.files],
+        "custom_search_engines": [dump_search_engine(se) for se in config.custom_search_engines],
+        "custom_browsers": [dump_browser(b) for b in config.custom_browsers],
+        "main": {
+            "private_search": config.main.private_search,
+            "language": config.main.language,
+            "sources": [str(source) for source in config.main.sources]
+        },
+        "browsers": {
+            "explicit": config.browsers.explicit.get_name() if config.browsers.explicit is not None else None,
+            "preferred": get_names(config.browsers.preferred),
+            "private_only": config.browsers.private_only,
+            "hide": get_names(config.browsers.hide),
+            "show": get_names(config.browsers.show),
+            "hide_based_on": get_names(config.browsers.hide_based_on),
+            "show_based_on": get_names(config.browsers.show_based_on)
+        },
+        "search_engines": {
+            "explicit": config.search_engines.explicit.get_name() if config.search_engines.explicit is not None else None,
+            "default": config.search_engines.default.get_name() if config.search_engines.default is not None else None,
+            "additional": get_names(config.search_engines.additional),
+            "private_only": config.search_engines.private_only,
+            "hide": get_names(config.search_engines.hide),
+            "show": get_names(config.search_engines.show)
+        },
+        "customization": vars(config.customization).copy(),
+        "history": vars(config.history).copy()
+    }
+
+
+def restore_configuration(config: 'Configuration', data: dict[str, Any]):
+    known_browsers = config.browsers.registry
+    known_search_engines = config.search_engines.registry
+    for settings in data["custom_search_engines"]:
+        config.custom_search_engines.append(known_search_engines.register(SearchEngine(**settings)))
+    for settings in data["custom_browsers"]:
+        settings = settings.copy()
+        settings["base"] = known_browsers[settings["base"]] if settings["base"] is not None else None
+        settings["search_engine"] = known_search_engines[settings["search_engine"]] if settings["search_engine"] is not None else None
+        config.custom_browsers.append(known_browsers.register(Browser(**settings)))
+
+    config.files = dict.fromkeys(Path(file) for file in data["files"])
+
+    main = data["main"]
+    config.main.private_search = main["private_search"]
+    config.main.language = main["language"]
+    config.main.sources = [Path(source) for source in main["sources"]]
+
+    browsers = data["browsers"]
+    config.browsers.explicit = known_browsers[browsers["explicit"]] if browsers["explicit"] is not None else None
+    config.browsers.preferred = [known_browsers[name] for name in browsers["preferred"]]
+    config.browsers.private_only = browsers["private_only"]
+    config.browsers.hide = [known_browsers[name] for name in browsers["hide"]]
+    config.browsers.show = [known_browsers[name] for name in browsers["show"]]
+    config.browsers.hide_based_on = [known_browsers[name] for name in browsers["hide_based_on"]]
+    config.browsers.show_based_on = [known_browsers[name] for name in browsers["show_based_on"]]
+
+    search_engines = data["search_engines"]
+    config.search_engines.explicit = known_search_engines[search_engines["explicit"]] if search_engines["explicit"] is not None else None
+    config.search_engines.default = known_search_engines[search_engines["default"]] if search_engines["default"] is not None else None
+    config.search_engines.additional = [known_search_engines[name] for name in search_engines["additional"]]
+    config.search_engines.private_only = search_engines["private_only"]
+    config.search_engines.hide = [known_search_engines[name] for name in search_engines["hide"]]
+    config.search_engines.show = [known_search_engines[name] for name in search_engines["show"]]
+
+    for setting, value in data["customization"].items():
+        setattr(config.customization, setting, value)
+    for setting, value in data["history"].items():
+        setattr(config.history, setting, value)
+
+
+def read_configuration_cache() -> Optional[dict[str, Any]]:
+    """
+    :return: The content of the cache, or None if it does not exist, is corrupted or outdated.
+    """
+    data = read_cache(CONFIG_CACHE_FILE)
+    if not isinstance(data, dict) or data.get("version") != CONFIG_CACHE_VERSION:
+        return None
+    return data
+
+
+def get_cached_user_config(data: Optional[dict[str, Any]]) -> Optional['UserConfig']:
+    """
+    :param data: The content of the cache.
+    :return: The cached location of the user configuration, or None if it may have changed.
+    """
+    location = data.get("location") if data is not None else None
+    if not isinstance(location, dict):
+        return None
+    try:
+        directories = [Path(directory) for directory in location["directories"]]
+        if [get_fingerprint(directory) for directory in directories] != location["fingerprints"]:
+            return None
+        return UserConfig(Path(location["file"]) if location["file"] is not None else None, directories, location["fingerprints"])
+    except (KeyError, TypeError):
+        return None
+
+
+def load_cached_configuration(data: Optional[dict[str, Any]], roots: list[Path], debug: bool = False) -> Optional['Configuration']:
+    """
+    Restores the configuration from the cache, if it is still valid.
+    It is restored into a new configuration, so an invalid cache leaves nothing half restored.
+    :param data: The content of the cache.
+    :param roots: The configuration files that would be loaded, in order.
+    :param debug: The debug mode of the configuration.
+    :return: The restored configuration, or None if it must be loaded from the files.
+    """
+    if data is None:
+        return None
+    if data.get("roots") != [str(root) for root in roots]:
+        return None
+    for fingerprint in data.get("fingerprints", []):
+        if get_fingerprint(Path(fingerprint[0])) != fingerprint:
+            return None
+    config = Configuration(debug=debug)
+    try:
+        restore_configuration(config, data["config"])
+    except (KeyError, TypeError):
+        return None
+    if config.debug:
+        print("Loaded cached configuration:", CONFIG_CACHE_FILE)
+    return config
+
+
+def save_configuration_cache(config: 'Configuration', roots: list[Path], user_config: 'UserConfig'):
+    fingerprints = [get_fingerprint(file) for file in config.files]
+    if None in fingerprints:
+        return
+    write_cache(CONFIG_CACHE_FILE, {
+        "version": CONFIG_CACHE_VERSION,
+        "roots": [str(root) for root in roots],
+        "fingerprints": fingerprints,
+        "location": {
+            "file": str(user_config.file) if user_config.file is not None else None,
+            "directories": [str(directory) for directory in user_config.directories],
+            "fingerprints": user_config.fingerprints
+        },
+        "config": dump_configuration(config)
+    })
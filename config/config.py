@@ -1,14 +1,26 @@
 import os
-from argparse import Namespace
 from pathlib import Path
-from typing import Optional
+from typing import TYPE_CHECKING, Any, NamedTuple, Optional
 
-from entries.browser import Browser, FIREFOX, BrowserException
-from entries.search_engine import SearchEngine, DUCKDUCKGO, SearchEngineException
+from entries.browser import BROWSERS, Browser, FIREFOX, BrowserException
+from entries.search_engine import SEARCH_ENGINES, SearchEngine, DUCKDUCKGO, SearchEngineException
+
+if TYPE_CHECKING:
+    from argparse import Namespace
+
+    from entries.registry import Registry
+
+    from .location import UserConfig
 
 DEFAULT_ALIASES_COLOR = "#444444"
 DEFAULT_LANGUAGE = 'en'
 DEFAULT_SEARCH_ENGINE = DUCKDUCKGO
+DEFAULT_BACKEND = "dmenu"
+DEFAULT_HISTORY_SIZE = 5
+BACKENDS = ["script", "dmenu"]
+# Settings the shown browsers and search engines depend on: setting one of them discards the memoized views
+BROWSER_FILTERS = frozenset({"preferred", "private_only", "hide", "show", "hide_based_on", "show_based_on"})
+SEARCH_ENGINE_FILTERS = frozenset({"private_only", "hide", "show"})
 
 
 def get_system_locale() -> str:
@@ -27,19 +39,29 @@ def get_system_locale() -> str:
     return locale
 
 
-def get_user_browser() -> Optional['Browser']:
-    return Browser.all.get(os.getenv("BROWSER"))
+def get_user_browser(registry: 'Registry[Browser]') -> Optional['Browser']:
+    return registry.get(os.getenv("BROWSER"))
 
 
 class Configuration:
+    """
+    The custom browsers and search engines are registered in overlays of the built-in ones,
+    so they only belong to this configuration.
+    """
 
     def __init__(self, debug: bool = False):
-        self.files: list['Path'] = []
+        # The loaded configuration files, in order (a dictionary, so checking if one was loaded is immediate)
+        self.files: dict['Path', None] = {}
+        # The location of the user configuration, when the configuration files were looked for
+        self.user_config: Optional['UserConfig'] = None
         self.debug = debug
+        self.custom_browsers: list['Browser'] = []
+        self.custom_search_engines: list['SearchEngine'] = []
         self.main = MainConfiguration()
-        self.browsers = BrowserConfiguration()
-        self.search_engines = SearchEngineConfiguration(self.browsers)
+        self.browsers = BrowserConfiguration(BROWSERS.create_overlay())
+        self.search_engines = SearchEngineConfiguration(SEARCH_ENGINES.create_overlay(), self.browsers)
         self.customization = CustomizationConfig()
+        self.history = HistoryConfiguration()
 
     def __str__(self) -> str:
         return f'{self.__class__.__name__}(lang="{self.main.get_language()}", browser="{self.browsers.get_browser().get_name()}", search_engine="{self.search_engines.get_search_engine().get_name()}")'
@@ -48,8 +70,7 @@ class Configuration:
         return file in self.files
 
     def load(self, file: 'Path'):
-        if file not in self.files:
-            self.files.append(file)
+        self.files.setdefault(file, None)
 
 
 class MainConfiguration:
@@ -79,9 +100,25 @@ class MainConfiguration:
         return self.private_search
 
 
+class BrowserFilter(NamedTuple):
+    shown: frozenset['Browser']
+    hidden: frozenset['Browser']
+    private_only: bool
+    shown_bases: frozenset['Browser']
+    hidden_bases: frozenset['Browser']
+
+
 class BrowserConfiguration:
+    """
+    The filters are lists, and must be replaced (not modified in place) to change the shown browsers.
+    """
 
-    def __init__(self):
+    def __init__(self, registry: 'Registry[Browser]'):
+        # The known browsers: the built-in ones and the custom ones
+        self.registry = registry
+        # Shown browsers, memoized by the browser left out (None for all of them)
+        self.views: dict[Optional['Browser'], tuple['Browser', ...]] = {}
+        self.revision = registry.revision
         self.explicit: Optional['Browser'] = None
         self.preferred: list['Browser'] = []
         self.private_only = False
@@ -90,12 +127,40 @@ class BrowserConfiguration:
         self.hide_based_on: list['Browser'] = []
         self.show_based_on: list['Browser'] = []
 
-    def get_all(self) -> list['Browser']:
-        browsers = []
-        for browser in Browser.all.values():
-            if self.is_valid(browser):
-                browsers.append(browser)
-        return browsers
+    def __setattr__(self, name: str, value: Any):
+        super().__setattr__(name, value)
+        if name in BROWSER_FILTERS:
+            self.views = {}
+
+    def get_all(self, exclude: Optional['Browser'] = None) -> tuple['Browser', ...]:
+        """
+        :param exclude: A browser to leave out, e.g. the current one.
+        :return: The browsers to show, memoized until the filters change or a browser is registered.
+        """
+        if self.revision != self.registry.revision:
+            self.views = {}
+            self.revision = self.registry.revision
+        view = self.views.get(exclude)
+        if view is None:
+            if exclude is None:
+                view = self.filter_all()
+            else:
+                view = tuple(browser for browser in self.get_all() if browser is not exclude)
+            self.views[exclude] = view
+        return view
+
+    def get_filter(self) -> 'BrowserFilter':
+        return BrowserFilter(
+            frozenset(self.show).union(self.preferred),
+            frozenset(self.hide),
+            self.private_only,
+            frozenset(self.show_based_on),
+            frozenset(self.hide_based_on)
+        )
+
+    def filter_all(self) -> tuple['Browser', ...]:
+        browser_filter = self.get_filter()
+        return tuple(browser for browser in self.registry.values() if self.is_valid(browser, browser_filter))
 
     def get_explicit(self) -> Optional['Browser']:
         if self.explicit is not None and self.explicit.is_installed():
@@ -115,34 +180,34 @@ class BrowserConfiguration:
         preferred = self.get_preferred_browser()
         if preferred is not None:
             return preferred
-        user_browser = get_user_browser()
+        user_browser = get_user_browser(self.registry)
         if user_browser is not None:
             return user_browser
         return FIREFOX
 
-    def is_valid(self, browser: 'Browser') -> bool:
+    def is_valid(self, browser: 'Browser', browser_filter: 'BrowserFilter') -> bool:
         if not browser.is_installed():
             return False
 
-        if browser in self.show or browser in self.preferred:
+        if browser in browser_filter.shown:
             return True
-        elif browser in self.hide:
+        elif browser in browser_filter.hidden:
             return False
 
-        if self.private_only and not browser.is_private():
+        if browser_filter.private_only and not browser.is_private():
             return False
 
         base = browser.get_base()
-        if base is None or base in self.show_based_on:
+        if base is None or base in browser_filter.shown_bases:
             return True
-        elif base is not None and base in self.hide_based_on:
+        elif base in browser_filter.hidden_bases:
             return False
         return True
 
-    def load_args(self, args: Namespace):
+    def load_args(self, args: 'Namespace'):
         preferred_browsers = args.preferred_browsers
         if preferred_browsers is not None:
-            browser = Browser.all.get(preferred_browsers)
+            browser = self.registry.get(preferred_browsers)
             if browser is None:
                 raise BrowserException(f"No browser named '{preferred_browsers}' found.")
             if not browser.is_installed():
@@ -150,35 +215,80 @@ class BrowserConfiguration:
             self.explicit = browser
 
 
+class SearchEngineFilter(NamedTuple):
+    shown: frozenset['SearchEngine']
+    hidden: frozenset['SearchEngine']
+    private_only: bool
+
+
 class SearchEngineConfiguration:
+    """
+    The filters are lists, and must be replaced (not modified in place) to change the shown search engines.
+    """
 
-    def __init__(self, browser_configuration: 'BrowserConfiguration'):
+    def __init__(self, registry: 'Registry[SearchEngine]', browser_configuration: 'BrowserConfiguration'):
+        # The known search engines: the built-in ones and the custom ones
+        self.registry = registry
+        # Shown search engines, memoized by the search engine left out (None for all of them)
+        self.views: dict[Optional['SearchEngine'], tuple['SearchEngine', ...]] = {}
+        self.revision = registry.revision
         self.browser_configuration = browser_configuration
         self.explicit: Optional['SearchEngine'] = None
         self.default: Optional['SearchEngine'] = None
+        self.additional: list['SearchEngine'] = []
         self.private_only = False
         self.hide: list['SearchEngine'] = []
         self.show: list['SearchEngine'] = []
 
-    def get_all(self) -> list['SearchEngine']:
-        search_engines = []
-        for search_engine in SearchEngine.all.values():
-            if self.is_valid(search_engine):
-                search_engines.append(search_engine)
-        return search_engines
+    def __setattr__(self, name: str, value: Any):
+        super().__setattr__(name, value)
+        if name in SEARCH_ENGINE_FILTERS:
+            self.views = {}
 
-    def is_valid(self, search_engine: 'SearchEngine') -> bool:
-        if search_engine in self.show:
+    def get_all(self, exclude: Optional['SearchEngine'] = None) -> tuple['SearchEngine', ...]:
+        """
+        :param exclude: A search engine to leave out, e.g. the current one.
+        :return: The search engines to show, memoized until the filters change or a search engine is registered.
+        """
+        if self.revision != self.registry.revision:
+            self.views = {}
+            self.revision = self.registry.revision
+        view = self.views.get(exclude)
+        if view is None:
+            if exclude is None:
+                view = self.filter_all()
+            else:
+                view = tuple(search_engine for search_engine in self.get_all() if search_engine is not exclude)
+            self.views[exclude] = view
+        return view
+
+    def get_filter(self) -> 'SearchEngineFilter':
+        return SearchEngineFilter(frozenset(self.show), frozenset(self.hide), self.private_only)
+
+    def filter_all(self) -> tuple['SearchEngine', ...]:
+        search_engine_filter = self.get_filter()
+        return tuple(search_engine for search_engine in self.registry.values() if self.is_valid(search_engine, search_engine_filter))
+
+    def is_valid(self, search_engine: 'SearchEngine', search_engine_filter: 'SearchEngineFilter') -> bool:
+        if search_engine in search_engine_filter.shown:
             return True
-        elif search_engine in self.hide:
+        elif search_engine in search_engine_filter.hidden:
             return False
-        elif self.private_only and not search_engine.is_private():
+        elif search_engine_filter.private_only and not search_engine.is_private():
             return False
         return True
 
+    def get_additional(self) -> list['SearchEngine']:
+        """
+        :return: The search engines to search at the same time as the main one, in other tabs.
+        """
+        return self.additional
+
     def get_search_engine(self, browser: Optional['Browser'] = None) -> 'SearchEngine':
         if self.explicit is not None:
             return self.explicit
+        if self.default is not None:
+            return self.default
         if browser is not None:
             browsers_search_engine = browser.get_search_engine()
         else:
@@ -187,13 +297,41 @@ class SearchEngineConfiguration:
             return browsers_search_engine
         return DEFAULT_SEARCH_ENGINE
 
-    def load_args(self, args: Namespace):
-        default_search_engine = args.default_search_engine
-        if default_search_engine is not None:
-            search_engine = SearchEngine.all.get(default_search_engine)
+    def load_args(self, args: 'Namespace'):
+        if args.default_search_engine is None:
+            return
+        search_engines: list['SearchEngine'] = []
+        for name in args.default_search_engine:
+            search_engine = self.registry.get(name)
             if search_engine is None:
-                raise SearchEngineException(f"No search engine named '{default_search_engine}' found.")
-            self.explicit = search_engine
+                raise SearchEngineException(f"No search engine named '{name}' found.")
+            search_engines.append(search_engine)
+        self.explicit = search_engines[0]
+        self.additional = search_engines[1:]
+
+
+class HistoryConfiguration:
+
+    def __init__(self):
+        self.enabled = True
+        self.size = DEFAULT_HISTORY_SIZE
+        self.include_private = False
+        self.suggestions = True
+
+    def is_enabled(self) -> bool:
+        return self.enabled
+
+    def get_size(self) -> int:
+        """
+        :return: The number of past searches to show in the search menu.
+        """
+        return self.size
+
+    def is_private_included(self) -> bool:
+        return self.include_private
+
+    def has_suggestions(self) -> bool:
+        return self.suggestions
 
 
 class CustomizationConfig:
@@ -203,9 +341,12 @@ class CustomizationConfig:
         self.kb_browsers: Optional[str] = None
         self.kb_change_language: Optional[str] = None
         self.kb_search_engine: Optional[str] = None
+        self.kb_add_search_engine: Optional[str] = None
         self.kb_toggle_private: Optional[str] = None
         self.rofi_config: Optional[str] = None
         self.width = 50
+        self.backend: Optional[str] = None
+        self.frontend: Optional[str] = None
 
     def get_aliases_color(self) -> str:
         if self.aliases_color is None:
@@ -215,9 +356,15 @@ class CustomizationConfig:
     def get_kb_browsers(self) -> Optional[str]:
         return self.kb_browsers
 
+    def get_kb_change_language(self) -> Optional[str]:
+        return self.kb_change_language
+
     def get_kb_search_engines(self) -> Optional[str]:
         return self.kb_search_engine
 
+    def get_kb_add_search_engine(self) -> Optional[str]:
+        return self.kb_add_search_engine
+
     def get_kb_toggle_private(self) -> Optional[str]:
         return self.kb_toggle_private
 
@@ -227,5 +374,22 @@ class CustomizationConfig:
     def get_width(self) -> int:
         return self.width
 
+    def get_backend(self) -> str:
+        """
+        Gets how the menus are displayed:
+        - "script": all menus are shown inside a single rofi process (rofi script mode)
+        - "dmenu": a new rofi process is spawned for every menu (also used with wofi)
+        :return: The name of the backend.
+        """
+        if self.backend is None:
+            return DEFAULT_BACKEND
+        return self.backend
+
+    def get_frontend(self) -> Optional[str]:
+        """
+        :return: The executable used to show the menus, or None to choose between rofi and wofi from the session type.
+        """
+        return self.frontend
+
 class ConfigurationException(Exception):
     pass
\ No newline at end of file
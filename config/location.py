@@ -1,5 +1,68 @@
+"""
+File containing the location of the configuration files.
+
+The user configuration is looked for in the standard locations,
+in order of priority. Instead of checking every location (and every
+possible file in them) separately, which costs a round trip per check on
+network home directories, ~/.config and ~ are each listed once,
+and the location is picked from these listings.
+"""
+import os
+import stat
 from pathlib import Path
-from typing import Optional
+from typing import Iterable, NamedTuple, Optional
+
+# Names of the configuration file inside a configuration directory, in order of priority
+CONFIG_FILE_NAMES = ("config.toml", "rofi-search.toml")
+
+
+class FileSystemCalls:
+    """
+    Number of calls made to the file system to locate the configuration and check its cache, reported when tracing.
+    """
+
+    def __init__(self):
+        self.listings = 0
+        self.stats = 0
+
+
+def get_fingerprint(file: Path) -> Optional[list]:
+    FILESYSTEM_CALLS.stats += 1
+    try:
+        stat_result = os.stat(file)
+    except OSError:
+        return None
+    return [str(file), stat_result.st_size, stat_result.st_mtime_ns]
+
+
+def list_directory(directory: Path, names: Iterable[str]) -> dict[str, bool]:
+    """
+    Lists the directory once, instead of checking each of the given entries separately.
+    :param names: The entries to look for.
+    :return: For every entry found that is a file or a directory (following links), whether it is a directory.
+    """
+    FILESYSTEM_CALLS.listings += 1
+    found: dict[str, bool] = {}
+    try:
+        with os.scandir(directory) as it:
+            for entry in it:
+                if entry.name not in names:
+                    continue
+                if entry.is_dir():
+                    found[entry.name] = True
+                elif entry.is_file():
+                    found[entry.name] = False
+    except OSError:
+        pass
+    return found
+
+
+def get_directory_config(directory: Path) -> Optional[Path]:
+    found = list_directory(directory, CONFIG_FILE_NAMES)
+    for name in CONFIG_FILE_NAMES:
+        if found.get(name) is False:
+            return directory / name
+    return None
 
 
 class ConfigLocation:
@@ -8,32 +71,28 @@ class ConfigLocation:
         self.path = path.resolve()
 
     def get_config_file(self) -> Path:
-        if self.path.is_file():
+        FILESYSTEM_CALLS.stats += 1
+        try:
+            mode = os.stat(self.path).st_mode
+        except OSError:
+            mode = 0
+        if stat.S_ISREG(mode):
             return self.path
-        elif self.path.is_dir():
-            file = self.get_directory_config()
+        elif stat.S_ISDIR(mode):
+            file = get_directory_config(self.path)
             if file is not None:
                 return file
             raise ConfigurationLocationException(f"The directory '{self.path}' does not contain any configuration file.")
         raise ConfigurationLocationException(f"'{self.path}' is neither a file nor a directory.")
 
-    def get_possible_files(self) -> list[Path]:
-        return [
-            self.path / "config.toml",
-            self.path / "rofi-search.toml"
-        ]
-
-    def is_valid(self) -> bool:
-        if self.path.is_file():
-            return True
-        elif self.path.is_dir():
-            return self.get_directory_config() is not None
-        return False
 
-    def get_directory_config(self) -> Optional[Path]:
-        for possible_path in self.get_possible_files():
-            if possible_path.exists() and possible_path.is_file():
-                return possible_path
+class UserConfig(NamedTuple):
+    # None if there is no user configuration
+    file: Optional[Path]
+    # The directories listed to find the file: the location may change if one of them is modified
+    directories: list[Path]
+    # Their fingerprints, taken before they were listed
+    fingerprints: list[Optional[list]]
 
 
 HOME_DIR = Path.home()
@@ -44,19 +103,39 @@ APP_XDG_CONFIG_FILE = XDG_CONFIG_DIR / "rofi-search.toml"
 APP_DOT_DIR = HOME_DIR / ".rofi-search/"
 APP_DOT_FILE = HOME_DIR / ".rofi-search.toml"
 
-STANDARD_LOCATIONS: list['ConfigLocation'] = [
-    ConfigLocation(APP_XDG_CONFIG_DIR),
-    ConfigLocation(APP_XDG_CONFIG_FILE),
-    ConfigLocation(APP_DOT_DIR),
-    ConfigLocation(APP_DOT_FILE),
+# In order of priority, each either a configuration file or a directory containing one
+STANDARD_PATHS: list[Path] = [
+    APP_XDG_CONFIG_DIR,
+    APP_XDG_CONFIG_FILE,
+    APP_DOT_DIR,
+    APP_DOT_FILE,
 ]
 
+FILESYSTEM_CALLS = FileSystemCalls()
+
 
-def get_user_config() -> Optional['ConfigLocation']:
-    for location in STANDARD_LOCATIONS:
-        if location.is_valid():
-            return location
+def find_user_config() -> 'UserConfig':
+    """
+    Finds the user configuration, listing ~/.config and ~ once each
+    (and the configuration directories found in them, if any).
+    """
+    names = {path.name for path in STANDARD_PATHS}
+    directories = [XDG_CONFIG_DIR, HOME_DIR]
+    fingerprints = [get_fingerprint(directory) for directory in directories]
+    listings = {directory: list_directory(directory, names) for directory in directories}
+    for path in STANDARD_PATHS:
+        is_directory = listings[path.parent].get(path.name)
+        if is_directory is None:
+            continue
+        if not is_directory:
+            return UserConfig(path, directories, fingerprints)
+        directories.append(path)
+        fingerprints.append(get_fingerprint(path))
+        file = get_directory_config(path)
+        if file is not None:
+            return UserConfig(file, directories, fingerprints)
+    return UserConfig(None, directories, fingerprints)
 
 
 class ConfigurationLocationException(Exception):
-    pass
\ No newline at end of file
+    pass
@@ -1,24 +1,44 @@
-import tomllib
-from argparse import Namespace
+import sys
 from pathlib import Path
-from typing import Any, Callable, Optional
+from typing import TYPE_CHECKING, Any, Callable, NamedTuple, Optional
 
-from entries.browser import Browser
+from entries.browser import MAX_URLS_PER_COMMAND, Browser
 from entries.search_engine import SearchEngine
+from tracing import TRACER
 
-from .config import Configuration
-from .location import ConfigLocation
+from .config import BACKENDS, Configuration
+
+if TYPE_CHECKING:
+    from argparse import Namespace
 
 
 Section = dict[str, Any]
-SimpleMethod = Callable[['ConfigParser'], Any]
+Loader = Callable[['ConfigParser', Any], Any]
 
 
-class MetaConfigParser(type):
+class Setting(NamedTuple):
+    name: str
+    type: type
+    loader: Loader
 
-    def __init__(cls, *args, **kwargs):
-        super().__init__(*args, **kwargs)
+
+class MetaConfigParser(type):
+    """
+    Builds the table of the settings of a parser when its class is created:
+    every setting name, in declaration order, with its type and its loader.
+    Settings of the base classes come first.
+    """
+
+    def __init__(cls, name: str, bases: tuple[type, ...], namespace: dict[str, Any]):
+        super().__init__(name, bases, namespace)
         cls.section: Optional[str] = None
+        cls.settings: dict[str, Setting] = {}
+        for base in reversed(cls.__mro__[1:]):
+            cls.settings.update(getattr(base, "settings", {}))
+        for attribute in namespace.values():
+            setting = getattr(attribute, "setting", None)
+            if isinstance(setting, Setting):
+                cls.settings[setting.name] = setting
 
 
 class ConfigParser(metaclass=MetaConfigParser):
@@ -28,14 +48,38 @@ class ConfigParser(metaclass=MetaConfigParser):
         self.data = data
 
     def load(self):
-        for attr in dir(self):
-            loader = getattr(self, attr)
-            if attr.startswith("load_") and callable(loader):
-                loader()
+        """
+        Checks every key of the section in a single pass, then calls the loader of every
+        given setting, in the order they are declared in (some depend on others).
+        Unknown keys are reported, with the closest known setting if any.
+        """
+        settings = self.__class__.settings
+        values: dict[str, Any] = {}
+        for key, value in self.data.items():
+            setting = settings.get(key)
+            if setting is None:
+                self.report_unknown_setting(key)
+            elif value is not None:
+                if not isinstance(value, setting.type):
+                    if setting.type is dict and self.__class__.section is None:
+                        raise MustBeSectionException(key)
+                    raise IncorrectTypeConfigException(self.__class__.section, key, setting.type)
+                values[key] = value
+        for name, setting in settings.items():
+            if name in values:
+                setting.loader(self, values[name])
         post_parsing = getattr(self, "post_parsing", None)
         if post_parsing is not None and callable(post_parsing):
             post_parsing()
 
+    def report_unknown_setting(self, key: str):
+        from difflib import get_close_matches
+
+        name = f"{self.__class__.section}.{key}" if self.__class__.section is not None else key
+        matches = get_close_matches(key, self.__class__.settings.keys(), n=1)
+        suggestion = f", did you mean '{matches[0]}'?" if len(matches) != 0 else "."
+        print(f"Unknown setting '{name}' in the configuration{suggestion}", file=sys.stderr)
+
 
 def section_parser(section: str):
     def decorator(cls: type) -> type:
@@ -44,34 +88,23 @@ def section_parser(section: str):
     return decorator
 
 
-def setting_parser(setting: str, type_: type) -> Callable[[Callable[['ConfigParser', Any], Any]], callable]:
-    def decorator(method: Callable[[ConfigParser, Any], Any]) -> Callable[[ConfigParser], Any]:
-        def loader_method(self: 'ConfigParser'):
-            data = self.data.get(setting)
-            if data is None:
-                return
-            elif not isinstance(data, type_):
-                raise IncorrectTypeConfigException(self.__class__.section, setting, type_)
-            return method(self, data)
-        return loader_method
+def setting_parser(setting: str, type_: type) -> Callable[[Loader], Loader]:
+    """
+    Declares a method as the loader of a setting, called with its value if it is given and of the right type.
+    The method is registered in the settings table of its parser (see MetaConfigParser).
+    """
+    def decorator(method: Loader) -> Loader:
+        method.setting = Setting(setting, type_, method)
+        return method
     return decorator
 
 
 class GlobalConfigParser(ConfigParser):
-
-    parsed: list[Path] = []
-
-    @classmethod
-    def from_location(cls, config: 'Configuration', location: 'ConfigLocation') -> Optional['GlobalConfigParser']:
-        file = location.get_config_file()
-        if config.has_loaded(file):
-            return None
-
-        if config.debug:
-            print("Parsing configuration:", file)
-        with location.get_config_file().open("rb") as f:
-            data = tomllib.load(f)
-            return cls(config, data)
+    """
+    Parses a whole configuration file (or the command line arguments).
+    Files included through `main.sources` are not loaded by the parser,
+    see SourceGraph, which gives every file to merge in order.
+    """
 
     @classmethod
     def from_arguments(cls, config: 'Configuration', args: 'Namespace'):
@@ -89,7 +122,9 @@ class GlobalConfigParser(ConfigParser):
                 "show_based_on": args.show_browsers_based_on
             },
             "search_engines": {
-                "default": args.default_search_engine,
+                "default": args.default_search_engine[0] if args.default_search_engine else None,
+                # A single search engine keeps the configured additional ones
+                "additional": args.default_search_engine[1:] if args.default_search_engine and len(args.default_search_engine) > 1 else None,
                 "private_only": args.private_search_engine_only,
                 "hide": args.hide_search_engines,
                 "show": args.show_search_engines
@@ -99,9 +134,15 @@ class GlobalConfigParser(ConfigParser):
                 "kb_browsers": args.kb_browsers,
                 "kb_change_language": args.kb_change_language,
                 "kb_search_engines": args.kb_search_engines,
+                "kb_add_search_engine": args.kb_add_search_engine,
                 "kb_toggle_private_search": args.kb_toggle_private_search,
                 "rofi_config": args.rofi_config,
-                "width": args.width
+                "width": args.width,
+                "backend": args.backend,
+                "frontend": args.frontend
+            },
+            "history": {
+                "size": args.history_size
             }
         }
 
@@ -117,71 +158,78 @@ class GlobalConfigParser(ConfigParser):
                 empty_sections.append(name)
         for section in empty_sections:
             data.pop(section)
-        return cls(config, data)
+        return cls(config, data, "arguments")
 
-    def __init__(self, config: 'Configuration', data: Section):
+    def __init__(self, config: 'Configuration', data: Section, source: str):
         super().__init__(config, data)
+        self.source = source
         self.sources: list[Path] = []
 
-    def internal_load_section(self, parser: MetaConfigParser):
-        section = self.data.get(parser.section)
-        if section is None:
-            return
-        elif not isinstance(section, dict):
-            raise MustBeSectionException(parser.section)
-        config_parser = parser(getattr(self.config, parser.section), section)
-        config_parser.load()
-
-    def load_sections(self):
-        self.internal_load_section(MainConfigParser)
-        self.internal_load_section(BrowsersConfigParser)
-        self.internal_load_section(SearchEnginesConfigParser)
-        self.internal_load_section(CustomizationConfigParser)
+    def load(self):
+        with TRACER.phase("config.load", source=self.source):
+            super().load()
 
     @setting_parser("browser", dict)
     def load_custom_browsers(self, custom_browsers_section: dict[str, dict[str, Any]]):
         for name, settings in custom_browsers_section.items():
             base_name = settings.get("base")
             if base_name is not None or base_name != "":
-                base = Browser.all.get(base_name)
+                base = self.config.browsers.registry.get(base_name)
                 if base is None:
                     raise ConfigParsingException(f"browser.{name}", f"'{base_name}' is not a browser name.")
             else:
                 base = None
-            Browser(
+            max_urls = settings.get("max_urls", MAX_URLS_PER_COMMAND)
+            if not isinstance(max_urls, int) or isinstance(max_urls, bool) or max_urls < 1:
+                raise ConfigParsingException(f"browser.{name}", "max_urls must be a number greater than 0.")
+            browser = self.config.browsers.registry.register(Browser(
                 settings["name"],
                 executable=settings["executable"],
                 aliases=settings.get("aliases"),
                 arguments=settings.get("arguments", []),
                 private_arguments=settings.get("private_arguments", []),
                 private=settings.get("private", False),
-                base=base
-            )
+                base=base,
+                max_urls=max_urls
+            ))
+            self.config.custom_browsers.append(browser)
 
     @setting_parser("search_engine", dict)
     def load_custom_search_engines(self, custom_search_engines_section: dict[str, dict[str, Any]]):
         for name, settings in custom_search_engines_section.items():
-            SearchEngine(
+            search_engine = self.config.search_engines.registry.register(SearchEngine(
                 settings["name"],
                 url=settings["url"],
                 aliases=settings.get("aliases"),
                 private=settings.get("private", False),
                 field=settings.get("field"),
                 escape=settings.get("escape", False)
-            )
-
-    def post_parsing(self):
-        for source in self.config.main.sources:
-            location = ConfigLocation(source)
-            path = location.get_config_file()
-            if path in GlobalConfigParser.parsed:
-                continue
-            if self.config.debug:
-                print("Loading config file:", path)
-            parser = GlobalConfigParser.from_location(self.config, location)
-            if parser is not None:
-                GlobalConfigParser.parsed.append(path)
-                parser.load()
+            ))
+            self.config.custom_search_engines.append(search_engine)
+
+    def load_section(self, parser: MetaConfigParser, section: Section):
+        parser(getattr(self.config, parser.section), section).load()
+
+    # Sections are loaded after the custom browsers and search engines, as they may refer to them
+    @setting_parser("main", dict)
+    def load_main(self, section: Section):
+        self.load_section(MainConfigParser, section)
+
+    @setting_parser("browsers", dict)
+    def load_browsers(self, section: Section):
+        self.load_section(BrowsersConfigParser, section)
+
+    @setting_parser("search_engines", dict)
+    def load_search_engines(self, section: Section):
+        self.load_section(SearchEnginesConfigParser, section)
+
+    @setting_parser("customization", dict)
+    def load_customization(self, section: Section):
+        self.load_section(CustomizationConfigParser, section)
+
+    @setting_parser("history", dict)
+    def load_history(self, section: Section):
+        self.load_section(HistoryConfigParser, section)
 
 
 @section_parser("main")
@@ -208,13 +256,12 @@ class MainConfigParser(ConfigParser):
 @section_parser("browsers")
 class BrowsersConfigParser(ConfigParser):
 
-    @classmethod
-    def get_browsers_from_names(cls, names: list[str]) -> list['Browser']:
+    def get_browsers_from_names(self, names: list[str]) -> list['Browser']:
         browsers: list['Browser'] = []
         for name in names:
-            browser = Browser.all.get(name)
+            browser = self.config.registry.get(name)
             if browser is None:
-                raise ConfigParsingException(cls.section, f"'{name}' is not the name os a web browser.")
+                raise ConfigParsingException(self.section, f"'{name}' is not the name os a web browser.")
             browsers.append(browser)
         return browsers
 
@@ -246,22 +293,25 @@ class BrowsersConfigParser(ConfigParser):
 @section_parser("search_engines")
 class SearchEnginesConfigParser(ConfigParser):
 
-    @classmethod
-    def get_search_engines_from_names(cls, names: list[str]) -> list['SearchEngine']:
+    def get_search_engines_from_names(self, names: list[str]) -> list['SearchEngine']:
         search_engines: list['SearchEngine'] = []
         for name in names:
-            search_engine = SearchEngine.all.get(name)
+            search_engine = self.config.registry.get(name)
             if search_engine is None:
-                raise ConfigParsingException(cls.section, f"'{name}' is not the name of a search engine.")
+                raise ConfigParsingException(self.section, f"'{name}' is not the name of a search engine.")
             search_engines.append(search_engine)
         return search_engines
 
     @setting_parser("default", str)
     def load_default(self, default: str):
-        search_engine = SearchEngine.all.get(default)
+        search_engine = self.config.registry.get(default)
         if search_engine is None:
-            raise ConfigParsingException(self.section, "No search engine named '{default}' was found.")
-        self.config.default = default
+            raise ConfigParsingException(self.section, f"No search engine named '{default}' was found.")
+        self.config.default = search_engine
+
+    @setting_parser("additional", list)
+    def load_additional(self, additional: list[str]):
+        self.config.additional = self.get_search_engines_from_names(additional)
 
     @setting_parser("private_only", bool)
     def load_private_only(self, private_only: bool):
@@ -295,6 +345,10 @@ class CustomizationConfigParser(ConfigParser):
     def load_kb_search_engines(self, kb_search_engines: str):
         self.config.kb_search_engine = kb_search_engines
 
+    @setting_parser("kb_add_search_engine", str)
+    def load_kb_add_search_engine(self, kb_add_search_engine: str):
+        self.config.kb_add_search_engine = kb_add_search_engine
+
     @setting_parser("kb_toggle_private_search", str)
     def load_kb_toggle_private_search(self, kb_toggle_private_search: str):
         self.config.kb_toggle_private = kb_toggle_private_search
@@ -311,6 +365,38 @@ class CustomizationConfigParser(ConfigParser):
             raise ConfigParsingException(self.section, "Width must be greater than 0% and has a maximum value of 100%.")
         self.config.width = width
 
+    @setting_parser("backend", str)
+    def load_backend(self, backend: str):
+        if backend not in BACKENDS:
+            raise ConfigParsingException(self.section, f"Backend must be one of {', '.join(BACKENDS)}.")
+        self.config.backend = backend
+
+    @setting_parser("frontend", str)
+    def load_frontend(self, frontend: str):
+        self.config.frontend = frontend
+
+
+@section_parser("history")
+class HistoryConfigParser(ConfigParser):
+
+    @setting_parser("enabled", bool)
+    def load_enabled(self, enabled: bool):
+        self.config.enabled = enabled
+
+    @setting_parser("size", int)
+    def load_size(self, size: int):
+        if size < 0:
+            raise ConfigParsingException(self.section, "Size must be a positive number.")
+        self.config.size = size
+
+    @setting_parser("include_private", bool)
+    def load_include_private(self, include_private: bool):
+        self.config.include_private = include_private
+
+    @setting_parser("suggestions", bool)
+    def load_suggestions(self, suggestions: bool):
+        self.config.suggestions = suggestions
+
 
 class ConfigParsingException(Exception):
 
@@ -325,8 +411,8 @@ class ConfigParsingException(Exception):
 class IncorrectTypeConfigException(ConfigParsingException):
 
     def __init__(self, section: Optional[str], setting: str, type_: type):
-        section_string = f"{self.section}." if self.section is not None else ""
-        super().__init__(section, f"Setting '{section_string}{setting}' must be of type '{type.__name__}'.")
+        section_string = f"{section}." if section is not None else ""
+        super().__init__(section, f"Setting '{section_string}{setting}' must be of type '{type_.__name__}'.")
         self.setting = setting
         self.type = type_
 
@@ -0,0 +1,137 @@
+"""
+File containing the loading of the configuration files graph.
+
+A configuration file can include other files through `main.sources`,
+which can include other files, and so on. All the files are first
+read and parsed (concurrently, level by level), then returned in
+declaration order: a file, followed by each of its sources (recursively),
+so that sources override the file including them.
+
+Files are identified by their device and inode, so a file included
+several times (or through different paths or links) is only loaded
+once, at its first occurrence. Cycles are reported and ignored.
+"""
+import os
+import sys
+from pathlib import Path
+from typing import Any, Iterable, NamedTuple
+
+from tracing import TRACER
+
+from .location import ConfigLocation
+
+Section = dict[str, Any]
+FileKey = tuple[int, int]
+
+MAX_READERS = 8
+
+
+class ConfigSource(NamedTuple):
+    file: Path
+    data: Section
+    sources: list[Path]
+
+
+def get_file_key(file: Path) -> FileKey:
+    stat = os.stat(file)
+    return stat.st_dev, stat.st_ino
+
+
+def get_declared_sources(data: Section) -> list[Path]:
+    """
+    :return: The configuration files declared in `main.sources`.
+    Invalid values are skipped, they are reported when the section is loaded.
+    """
+    main = data.get("main")
+    sources = main.get("sources") if isinstance(main, dict) else None
+    if not isinstance(sources, list):
+        return []
+    return [ConfigLocation(Path(source).expanduser()).get_config_file() for source in sources if isinstance(source, str)]
+
+
+def read_source(file: Path) -> 'ConfigSource':
+    import tomllib
+
+    with TRACER.phase("config.read", file=str(file)), file.open("rb") as f:
+        data = tomllib.load(f)
+    return ConfigSource(file, data, get_declared_sources(data))
+
+
+class SourceGraph:
+
+    def __init__(self, debug: bool = False):
+        self.debug = debug
+        self.sources: dict[FileKey, 'ConfigSource'] = {}
+        self.keys: dict[Path, FileKey] = {}
+
+    def get_key(self, file: Path) -> FileKey:
+        key = self.keys.get(file)
+        if key is None:
+            key = self.keys[file] = get_file_key(file)
+        return key
+
+    def read(self, files: list[Path]) -> list['ConfigSource']:
+        """
+        Reads and parses the files, concurrently if there are more than one.
+        Errors are raised in the order of the files, so they do not depend on the scheduling.
+        """
+        if self.debug:
+            for file in files:
+                print("Parsing configuration:", file)
+        if len(files) == 1:
+            return [read_source(files[0])]
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=min(MAX_READERS, len(files))) as executor:
+            futures = [executor.submit(read_source, file) for file in files]
+            return [future.result() for future in futures]
+
+    def discover(self, roots: Iterable[Path]):
+        """
+        Reads every file reachable from the roots, one level of sources at a time.
+        """
+        frontier: dict[FileKey, Path] = {}
+        for root in roots:
+            frontier.setdefault(self.get_key(root), root)
+        while len(frontier) != 0:
+            for key, source in zip(frontier.keys(), self.read(list(frontier.values()))):
+                self.sources[key] = source
+            next_frontier: dict[FileKey, Path] = {}
+            for key in frontier.keys():
+                for file in self.sources[key].sources:
+                    file_key = self.get_key(file)
+                    if file_key not in self.sources:
+                        next_frontier.setdefault(file_key, file)
+            frontier = next_frontier
+
+    def load(self, roots: list[Path]) -> list['ConfigSource']:
+        """
+        :param roots: The configuration files to load, in order.
+        :return: Every configuration file to merge, in declaration order, each only once.
+        """
+        self.discover(roots)
+        ordered: list['ConfigSource'] = []
+        merged: set[FileKey] = set()
+        ancestors: list[FileKey] = []
+        visiting: set[FileKey] = set()
+
+        def visit(file: Path):
+            key = self.get_key(file)
+            if key in visiting:
+                cycle = " -> ".join(str(self.sources[ancestor].file) for ancestor in ancestors[ancestors.index(key):])
+                print(f"Configuration sources form a cycle, ignoring: {cycle} -> {file}", file=sys.stderr)
+                return
+            if key in merged:
+                return
+            merged.add(key)
+            source = self.sources[key]
+            ordered.append(source)
+            ancestors.append(key)
+            visiting.add(key)
+            for child in source.sources:
+                visit(child)
+            visiting.remove(ancestors.pop())
+
+        for root in roots:
+            visit(root)
+        return ordered
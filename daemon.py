@@ -0,0 +1,264 @@
+"""
+File containing the rofi-search daemon (see rofi-search --daemon).
+
+The daemon keeps the interpreter, the imported modules and the
+loaded configuration in memory, and listens on a Unix socket for
+requests sent by the thin client (client.py).
+Every request is handled in a forked child process, which receives
+the arguments, environment and standard file descriptors of the
+client, so that each request runs exactly as if rofi-search had
+been started by the client itself, without paying for the
+interpreter startup, the imports and the configuration loading.
+
+The configuration is reloaded before handling a request when any
+of the files that contributed to it changed, or when a new user
+configuration file was created. If it cannot be reloaded (e.g. a
+typo in a file being edited), the client is asked to run the request
+by itself, which reports the error, until the configuration is fixed.
+
+A lock file next to the socket is held while the daemon runs, so that
+a single daemon binds the socket. Unless debugging, the daemon goes
+to the background once it listens.
+"""
+import fcntl
+import json
+import os
+import signal
+import socket
+import stat
+import sys
+import traceback
+from typing import TYPE_CHECKING, Callable, Optional
+
+from client import FALLBACK_RESPONSE, get_socket_path
+from config import Configuration, find_user_config
+from config.cache import get_fingerprint
+from entries.executable import EXECUTABLES
+
+if TYPE_CHECKING:
+    from config import UserConfig
+
+MAX_REQUEST_SIZE = 1024 * 1024
+REAP_INTERVAL = 1.0
+
+
+class Daemon:
+
+    def __init__(self, load: Callable[[], 'Configuration'], handle: Callable[['Configuration', list[str]], int], debug: bool = False):
+        """
+        :param load: Function loading the configuration from the configuration files.
+        :param handle: Function handling a request from its arguments, using the given (base) configuration.
+        :param debug: Prints every request received.
+        """
+        self.load = load
+        self.handle = handle
+        self.debug = debug
+        self.path = get_socket_path()
+        self.lock_fd: Optional[int] = None
+        self.config: Optional['Configuration'] = None
+        self.fingerprints: list[Optional[list]] = []
+        self.user_config: Optional['UserConfig'] = None
+
+    def is_outdated(self) -> bool:
+        if self.config is None:
+            return True
+        if self.fingerprints != [get_fingerprint(file) for file in self.config.files]:
+            return True
+        return self.is_user_config_moved()
+
+    def is_user_config_moved(self) -> bool:
+        """
+        :return: Whether another user configuration file is used (e.g. a new one was created).
+        It is only looked for again when one of the directories listed to find it changed.
+        """
+        location = self.user_config
+        if location is not None and location.fingerprints == [get_fingerprint(directory) for directory in location.directories]:
+            return False
+        location = find_user_config()
+        if location.file is not None and not self.config.has_loaded(location.file):
+            return True
+        self.user_config = location
+        return False
+
+    def reload(self):
+        if self.debug:
+            print("Loading configuration")
+        self.config = self.load()
+        self.fingerprints = [get_fingerprint(file) for file in self.config.files]
+        self.user_config = self.config.user_config
+
+    def lock(self):
+        """
+        Locks the socket for the lifetime of the daemon (the lock is released when it exits, even if it is killed).
+        """
+        self.make_directory()
+        try:
+            fd = os.open(f"{self.path}.lock", os.O_RDWR | os.O_CREAT | os.O_NOFOLLOW, 0o600)
+        except OSError as e:
+            raise DaemonException(f"Cannot open the lock file of '{self.path}': {e.strerror}.")
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            raise DaemonException(f"A daemon is already listening on '{self.path}'.")
+        self.lock_fd = fd
+
+    def make_directory(self):
+        """
+        Creates the directory of the socket, which only the user may write to, so nobody else can replace the socket.
+        """
+        directory = os.path.dirname(self.path)
+        try:
+            os.mkdir(directory, 0o700)
+        except FileExistsError:
+            pass
+        except OSError as e:
+            raise DaemonException(f"Cannot create the directory '{directory}': {e.strerror}.")
+        info = os.lstat(directory)
+        if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() or info.st_mode & 0o022 != 0:
+            raise DaemonException(f"'{directory}' must be a directory owned by you, that only you can write to.")
+
+    def bind(self) -> 'socket.socket':
+        """
+        Binds the socket, replacing the one left by a daemon that did not exit cleanly, if any (the lock must be held).
+        """
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        old_umask = os.umask(0o177)
+        try:
+            server.bind(self.path)
+        finally:
+            os.umask(old_umask)
+        server.listen()
+        server.settimeout(REAP_INTERVAL)
+        return server
+
+    @staticmethod
+    def detach():
+        """
+        Continues in a child process, in its own session and without terminal, so the command returns.
+        """
+        sys.stdout.flush()
+        sys.stderr.flush()
+        if os.fork() != 0:
+            os._exit(0)
+        os.setsid()
+        null = os.open(os.devnull, os.O_RDWR)
+        for fd in range(3):
+            os.dup2(null, fd)
+        os.close(null)
+
+    def serve(self):
+        self.lock()
+        self.reload()
+        server = self.bind()
+        if not self.debug:
+            self.detach()
+        signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+        if self.debug:
+            print("Listening on", self.path)
+        try:
+            while True:
+                self.reap()
+                try:
+                    connection, _ = server.accept()
+                except socket.timeout:
+                    continue
+                with connection:
+                    if self.is_outdated():
+                        try:
+                            self.reload()
+                        except Exception:
+                            if self.debug:
+                                traceback.print_exc()
+                            self.fall_back(connection)
+                            continue
+                    EXECUTABLES.refresh()
+                    sys.stdout.flush()
+                    sys.stderr.flush()
+                    if os.fork() == 0:
+                        server.close()
+                        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+                        os._exit(self.handle_connection(connection))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.close()
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+
+    @staticmethod
+    def reap():
+        try:
+            while os.waitpid(-1, os.WNOHANG)[0] != 0:
+                pass
+        except ChildProcessError:
+            pass
+
+    @staticmethod
+    def receive(connection: 'socket.socket') -> tuple[Optional[dict], list[int]]:
+        """
+        :return: The request of the client (None if it closed the connection before sending it), and its standard file descriptors.
+        """
+        connection.settimeout(None)
+        message, fds, _, _ = socket.recv_fds(connection, MAX_REQUEST_SIZE, 3)
+        while not message.endswith(b"\n"):
+            chunk = connection.recv(MAX_REQUEST_SIZE)
+            if len(chunk) == 0:
+                return None, fds
+            message += chunk
+        return json.loads(message), fds
+
+    def fall_back(self, connection: 'socket.socket'):
+        """
+        Asks the client to run its request by itself.
+        """
+        try:
+            _, fds = self.receive(connection)
+            for fd in fds:
+                os.close(fd)
+            connection.sendall(FALLBACK_RESPONSE)
+        except OSError:
+            pass
+
+    def handle_connection(self, connection: 'socket.socket') -> int:
+        """
+        Handles a request in the forked child process.
+        :param connection: The connection to the client.
+        :return: The exit code of the child process.
+        """
+        request, fds = self.receive(connection)
+        if request is None:
+            return 1
+        if self.debug:
+            print("Request:", request["args"])
+
+        os.environ.clear()
+        os.environ.update(request["env"])
+        os.chdir(request["cwd"])
+        for target, fd in enumerate(fds):
+            os.dup2(fd, target)
+            os.close(fd)
+        EXECUTABLES.refresh()
+
+        try:
+            exit_code = self.handle(self.config, request["args"])
+        except SystemExit as e:
+            if e.code is None or isinstance(e.code, int):
+                exit_code = e.code or 0
+            else:
+                print(e.code, file=sys.stderr)
+                exit_code = 1
+        except Exception:
+            traceback.print_exc()
+            exit_code = 1
+        sys.stdout.flush()
+        sys.stderr.flush()
+        EXECUTABLES.save()
+        connection.sendall(f"{int(exit_code)}\n".encode())
+        return 0
+
+
+class DaemonException(Exception):
+    pass
@@ -17,14 +17,23 @@ configuration to accept exceptions.
 Please feel free to request any browser that you would
 like to see supported.
 """
-import subprocess
-from shutil import which
-from typing import Optional
+from typing import TYPE_CHECKING, Iterable, Optional
 
+from tracing import TRACER
 
 from .entry import Entry
+from .executable import EXECUTABLES
+from .registry import Registry
 from .search_engine import SearchEngine
 
+if TYPE_CHECKING:
+    from subprocess import Popen
+
+# Maximum number of URLs to give to a browser in a single command
+MAX_URLS_PER_COMMAND = 50
+# Time (in seconds) a detached browser is waited for, to report it if it exits at once with an error
+DETACH_GRACE = 0.05
+
 
 class Browser(Entry):
     """
@@ -46,25 +55,23 @@ class Browser(Entry):
     LibreWolf is based on Firefox.
     """
 
-    all: dict[str, 'Browser'] = {}
-
-    def __new__(cls, name: str, *args, **kwargs):
-        obj = super().__new__(cls)
-        cls.all[name] = obj
-        return obj
+    __slots__ = ("arguments", "private", "base", "search_engine", "private_arguments", "max_urls")
 
-    def __init__(self, name: str, executable: str, aliases: Optional[list[str]] = None, arguments: Optional[list[str]] = None, private: bool = False, base: Optional['Browser'] = None, search_engine: Optional['SearchEngine'] = None, private_arguments: Optional[list[str]] = None):
+    def __init__(self, name: str, executable: str, aliases: Optional[Iterable[str]] = None, arguments: Optional[Iterable[str]] = None, private: bool = False, base: Optional['Browser'] = None, search_engine: Optional['SearchEngine'] = None, private_arguments: Optional[Iterable[str]] = None, max_urls: int = MAX_URLS_PER_COMMAND):
+        aliases = tuple(aliases) if aliases is not None else ()
+        lower_name = name.lower()
+        if lower_name not in aliases:
+            aliases = (lower_name, *aliases)
+        if executable not in aliases:
+            aliases = (executable, *aliases)
         super().__init__(name, executable, aliases)
-        lower_name = self.name.lower()
-        if lower_name not in self.aliases:
-            self.aliases.insert(0, lower_name)
-        if executable not in self.aliases:
-            self.aliases.insert(0, executable)
-        self.arguments = arguments if arguments is not None else []
-        self.private = private
-        self.base = base
-        self.search_engine = search_engine
-        self.private_arguments = private_arguments if private_arguments is not None else []
+        initialize = object.__setattr__
+        initialize(self, "arguments", tuple(arguments) if arguments is not None else ())
+        initialize(self, "private", private)
+        initialize(self, "base", base)
+        initialize(self, "search_engine", search_engine)
+        initialize(self, "private_arguments", tuple(private_arguments) if private_arguments is not None else ())
+        initialize(self, "max_urls", max_urls)
 
     def __str__(self) -> str:
         private_string = ", private" if self.is_private() else ""
@@ -74,7 +81,7 @@ class Browser(Entry):
     def get_executable(self) -> str:
         return self.utility
 
-    def get_arguments(self) -> list[str]:
+    def get_arguments(self) -> tuple[str, ...]:
         return self.arguments
 
     def get_base(self) -> Optional['Browser']:
@@ -87,37 +94,115 @@ class Browser(Entry):
         return self.private
 
     def is_installed(self) -> bool:
-        return which(self.get_executable()) is not None
+        return EXECUTABLES.which(self.get_executable()) is not None
+
+    def get_max_urls(self) -> int:
+        """
+        :return: The maximum number of URLs the browser accepts in a single command.
+        """
+        return self.max_urls
 
     def get_command(self, url: str, private: bool = False) -> list[str]:
+        return self.get_batch_command([url], private=private)
+
+    def get_batch_command(self, urls: list[str], private: bool = False) -> list[str]:
+        """
+        Gets the command opening all the given URLs at once (each in a new tab).
+        :param urls: The URLs to open, at most get_max_urls().
+        :param private: If the URLs should be opened in a private tab/window.
+        """
         command = [self.get_executable()]
         command.extend(self.get_arguments())
         if private:
             command.extend(self.private_arguments)
-        command.append(url)
+        command.extend(urls)
         return command
 
-    def spawn(self, url: str, private: bool = False):
-        return subprocess.run(self.get_command(url, private=private))
+    def spawn(self, url: str, private: bool = False, detach: bool = False):
+        """
+        Opens the given URL in the browser.
+        :param url: The URL to open.
+        :param private: If the URL should be opened in a private tab/window.
+        :param detach: Starts the browser in its own session and returns without waiting for it to exit.
+        """
+        return self.run(self.get_command(url, private=private), detach=detach)
+
+    def spawn_batch(self, urls: list[str], private: bool = False, detach: bool = False):
+        return self.run(self.get_batch_command(urls, private=private), detach=detach)
+
+    def run(self, command: list[str], detach: bool = False):
+        with TRACER.phase("browser.spawn", browser=self.get_name(), detach=detach):
+            return self.run_command(command, detach)
+
+    def run_command(self, command: list[str], detach: bool):
+        """
+        Runs the command of the browser. Failing to start it (e.g. a missing executable)
+        is detected by subprocess itself, and a detached browser is only waited for during DETACH_GRACE,
+        to report it if it exits with an error (e.g. invalid arguments).
+        """
+        import subprocess
+
+        if not detach:
+            try:
+                return subprocess.run(command)
+            except OSError as e:
+                raise BrowserException(f"Could not start {self.get_name()}: {e.strerror}.")
+        reap_detached()
+        try:
+            process = subprocess.Popen(
+                command,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                close_fds=True,
+                start_new_session=True
+            )
+        except OSError as e:
+            raise BrowserException(f"Could not start {self.get_name()}: {e.strerror}.")
+        try:
+            return_code = process.wait(timeout=DETACH_GRACE)
+        except subprocess.TimeoutExpired:
+            # Still running: the browser started
+            DETACHED.append(process)
+            return process
+        if return_code != 0:
+            raise BrowserException(f"{self.get_name()} exited with code {return_code}.")
+        return process
+
+
+def reap_detached():
+    """
+    Forgets the detached browsers that exited, once their exit status is collected.
+    """
+    DETACHED[:] = [process for process in DETACHED if process.poll() is None]
 
 
 class BrowserException(Exception):
     pass
 
 
-CHROMIUM = Browser("Chromium", "chromium")
-FIREFOX = Browser("Firefox", "firefox", private_arguments=["--private-window"])
-
-BRAVE = Browser("Brave", "brave", private=True, base=CHROMIUM)
-CHROME = Browser("Chrome", "chrome", base=CHROMIUM)
-FLOORP = Browser("Floorp", "floorp", private=True, base=FIREFOX, private_arguments=["--private-window"])
-ICECAT = Browser("Ice Cat", "icecat", private=True, base=FIREFOX)
-LIBREWOLF = Browser("Librewolf", "librewolf", private=True, base=FIREFOX, private_arguments=["--private-window"])
-OPERA = Browser("Opera", "opera", base=CHROMIUM)
-PALEMOON = Browser("Palemoon", "palemoon", [], private=True, base=FIREFOX)
-QUTEBROWSER = Browser("qutebrowser", "qutebrowser", base=CHROMIUM, private_arguments=["--target", "private-window"])
-TOR = Browser("Tor", "tor", base=FIREFOX, private=True)
-UNGOOGLED_CHROMIUM = Browser("Ungoogled Chromium", "ungoogled_chromium", private=True, base=CHROMIUM)
-VIVALDI = Browser("Vivaldi", "vivaldi", base=CHROMIUM)
-WATERFOX = Browser("Waterfox", "waterfox", private=True, base=FIREFOX, private_arguments=["--private-window"])
-ZEN = Browser("Zen", "zen-browser", private=True, base=FIREFOX)
\ No newline at end of file
+# The browsers started detached and still running, kept to collect their exit status (e.g. in the daemon)
+DETACHED: list['Popen'] = []
+
+
+BROWSERS: Registry['Browser'] = Registry()
+
+CHROMIUM = BROWSERS.register(Browser("Chromium", "chromium"))
+FIREFOX = BROWSERS.register(Browser("Firefox", "firefox", private_arguments=["--private-window"]))
+
+BRAVE = BROWSERS.register(Browser("Brave", "brave", private=True, base=CHROMIUM))
+CHROME = BROWSERS.register(Browser("Chrome", "chrome", base=CHROMIUM))
+FLOORP = BROWSERS.register(Browser("Floorp", "floorp", private=True, base=FIREFOX, private_arguments=["--private-window"]))
+ICECAT = BROWSERS.register(Browser("Ice Cat", "icecat", private=True, base=FIREFOX))
+LIBREWOLF = BROWSERS.register(Browser("Librewolf", "librewolf", private=True, base=FIREFOX, private_arguments=["--private-window"]))
+OPERA = BROWSERS.register(Browser("Opera", "opera", base=CHROMIUM))
+PALEMOON = BROWSERS.register(Browser("Palemoon", "palemoon", [], private=True, base=FIREFOX))
+QUTEBROWSER = BROWSERS.register(Browser("qutebrowser", "qutebrowser", base=CHROMIUM, private_arguments=["--target", "private-window"]))
+TOR = BROWSERS.register(Browser("Tor", "tor", base=FIREFOX, private=True))
+UNGOOGLED_CHROMIUM = BROWSERS.register(Browser("Ungoogled Chromium", "ungoogled_chromium", private=True, base=CHROMIUM))
+VIVALDI = BROWSERS.register(Browser("Vivaldi", "vivaldi", base=CHROMIUM))
+WATERFOX = BROWSERS.register(Browser("Waterfox", "waterfox", private=True, base=FIREFOX, private_arguments=["--private-window"]))
+ZEN = BROWSERS.register(Browser("Zen", "zen-browser", private=True, base=FIREFOX))
+
+# The custom browsers are registered in the overlay of each configuration
+BROWSERS.freeze()
\ No newline at end of file
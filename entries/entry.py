@@ -1,18 +1,56 @@
-from typing import Optional
+from operator import attrgetter
+from typing import Any, Callable, Iterable
 
 
 class Entry:
-    
-    def __init__(self, name: str, utility: str, aliases: Optional[list[str]] = None):
-        self.name = name
-        self.utility = utility
-        self.aliases = aliases if aliases is not None else []
+    """
+    An entry of the menus (a browser or a search engine), immutable once created.
+    Its aliases are a tuple, and its lookup keys (lowercase name and aliases)
+    are computed once, when it is created.
+    """
 
-    def get_aliases(self) -> list[str]:
+    __slots__ = ("name", "utility", "aliases", "keys")
+    # Reads the value of every attribute of an entry, built again for every subclass
+    read_fields: Callable[['Entry'], tuple] = staticmethod(attrgetter(*__slots__))
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.read_fields = staticmethod(attrgetter(*(slot for base in reversed(cls.__mro__) for slot in base.__dict__.get("__slots__", ()))))
+
+    def __init__(self, name: str, utility: str, aliases: Iterable[str] = ()):
+        aliases = tuple(aliases)
+        initialize = object.__setattr__
+        initialize(self, "name", name)
+        initialize(self, "utility", utility)
+        initialize(self, "aliases", aliases)
+        initialize(self, "keys", tuple(dict.fromkeys([name.lower(), *(alias.lower() for alias in aliases)])))
+
+    def __setattr__(self, attribute: str, value: Any):
+        raise AttributeError(f"{self.__class__.__name__} entries are immutable, '{attribute}' cannot be set.")
+
+    def is_same(self, other: 'Entry') -> bool:
+        """
+        :return: True if the other entry has the same class and attributes.
+        """
+        return self.__class__ is other.__class__ and self.get_fields() == other.get_fields()
+
+    def get_fields(self) -> tuple:
+        """
+        :return: The value of every attribute of the entry.
+        """
+        return self.read_fields(self)
+
+    def get_aliases(self) -> tuple[str, ...]:
         return self.aliases
 
+    def get_keys(self) -> tuple[str, ...]:
+        """
+        :return: The lowercase name and aliases of the entry, without duplicates.
+        """
+        return self.keys
+
     def get_entry(self, aliases_color: str) -> str:
         return f'{self.get_name()} <span color="{aliases_color}">{" ".join(self.get_aliases())}</span>'
 
     def get_name(self) -> str:
-        return self.name
\ No newline at end of file
+        return self.name
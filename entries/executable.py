@@ -0,0 +1,164 @@
+"""
+File containing the cache of resolved executables.
+
+Looking up an executable in $PATH requires to check every
+directory of $PATH, which is done for every browser multiple
+times per launch. The results are stored on disk, and are
+valid as long as $PATH and the modification times of its
+directories do not change: installing or removing an
+executable modifies its directory, which invalidates the cache.
+
+When the cache is invalidated, the executables are either searched
+in $PATH one by one, as which() does, or resolved from an index built
+by listing every directory of $PATH only once. Listing a directory
+costs more than checking a few names in it, so the index only pays off
+for large catalogs (about 25 executables with 100 files per directory,
+more with larger directories, see benchmarks/executables.py): the
+strategy is chosen once, from the number of executables that may be
+looked up (the known browsers).
+"""
+import atexit
+import os
+from pathlib import Path
+from typing import Optional
+
+from cache import APP_CACHE_DIR, read_cache, write_cache
+from tracing import TRACER
+
+# Number of executables above which indexing $PATH is faster than searching it for each one
+INDEX_THRESHOLD = 25
+
+
+def get_path_directories() -> list[str]:
+    return os.getenv("PATH", os.defpath).split(os.pathsep)
+
+
+def get_path_key() -> dict:
+    """
+    Computes the key identifying the current state of $PATH.
+    :return: The value of $PATH, and the modification time of each of its directories.
+    """
+    path = os.getenv("PATH", os.defpath)
+    mtimes: list[Optional[int]] = []
+    for directory in get_path_directories():
+        try:
+            mtimes.append(os.stat(directory or ".").st_mtime_ns)
+        except OSError:
+            mtimes.append(None)
+    return {"path": path, "mtimes": mtimes}
+
+
+def search_path(executable: str, directories: list[str]) -> Optional[str]:
+    """
+    Searches the directories of $PATH in order for an executable, as which() does.
+    """
+    for directory in directories:
+        path = os.path.join(directory or ".", executable)
+        if os.access(path, os.X_OK) and not os.path.isdir(path):
+            return path
+    return None
+
+
+class ExecutableIndex:
+    """
+    Index of every file in the directories of $PATH, by name.
+    The directories are listed once, and every lookup afterward is
+    a dictionary access. As with which(), the first executable
+    found in $PATH order wins.
+    """
+
+    def __init__(self, directories: list[str]):
+        self.candidates: dict[str, list[str]] = {}
+        for directory in directories:
+            try:
+                with os.scandir(directory or ".") as it:
+                    for entry in it:
+                        self.candidates.setdefault(entry.name, []).append(entry.path)
+            except OSError:
+                continue
+
+    def __len__(self) -> int:
+        return len(self.candidates)
+
+    def which(self, executable: str) -> Optional[str]:
+        for path in self.candidates.get(executable, ()):
+            if os.access(path, os.X_OK) and not os.path.isdir(path):
+                return path
+        return None
+
+
+class ExecutableCache:
+
+    def __init__(self, file: Path):
+        self.file = file
+        self.resolved: Optional[dict[str, Optional[str]]] = None
+        self.key: Optional[dict] = None
+        self.index: Optional[ExecutableIndex] = None
+        # Number of executables that may be looked up, choosing how the missing ones are resolved
+        self.catalog_size = 0
+        self.modified = False
+        self.hits = 0
+        self.misses = 0
+
+    def __str__(self) -> str:
+        return f"{self.__class__.__name__}(hits={self.hits}, misses={self.misses}, file=\"{self.file}\")"
+
+    def load(self):
+        self.key = get_path_key()
+        self.resolved = {}
+        data = read_cache(self.file)
+        if isinstance(data, dict) and data.get("key") == self.key and isinstance(data.get("resolved"), dict):
+            self.resolved = data["resolved"]
+
+    def refresh(self):
+        """
+        Reloads the cache if $PATH changed since it was loaded.
+        Only needed by long-running processes.
+        """
+        if self.resolved is not None and get_path_key() != self.key:
+            self.save()
+            self.index = None
+            self.load()
+
+    def set_catalog_size(self, size: int):
+        """
+        :param size: The number of executables that may be looked up (e.g. the known browsers).
+        """
+        self.catalog_size = size
+
+    def save(self):
+        if self.modified:
+            write_cache(self.file, {"key": self.key, "resolved": self.resolved})
+            self.modified = False
+
+    def which(self, executable: str) -> Optional[str]:
+        """
+        Resolves an executable in $PATH, using the cache if possible.
+        :param executable: The name of the executable.
+        :return: The path to the executable, or None if it was not found.
+        """
+        if os.sep in executable:
+            from shutil import which
+
+            return which(executable)
+        if self.resolved is None:
+            self.load()
+        if executable in self.resolved:
+            self.hits += 1
+            return self.resolved[executable]
+        self.misses += 1
+        if self.catalog_size <= INDEX_THRESHOLD:
+            resolved = search_path(executable, get_path_directories())
+        else:
+            if self.index is None:
+                with TRACER.phase("executables.scan"):
+                    self.index = ExecutableIndex(get_path_directories())
+            resolved = self.index.which(executable)
+        self.resolved[executable] = resolved
+        if not self.modified:
+            self.modified = True
+            atexit.register(self.save)
+        return resolved
+
+
+EXECUTABLES = ExecutableCache(APP_CACHE_DIR / "executables.json")
@@ -0,0 +1,142 @@
+"""
+File containing the registry of the known browsers or search engines.
+
+Entries are registered explicitly, by name, and can be looked up by
+name or by alias (case-insensitive). Entries registered later override
+previous ones using the same name or alias.
+Registering an entry identical to the registered one (e.g. when the same
+configuration is loaded again) keeps the registered one, so it is
+neither duplicated nor replaced.
+
+Registries are layered: the built-in entries are registered in a base
+registry, frozen once they are all registered, and every configuration
+registers its custom entries in its own overlay of this base. An overlay
+only stores its own entries and looks the others up in its base, so
+creating or dropping one (e.g. when reloading the configuration) costs
+as much as its custom entries, and never changes the built-in ones.
+"""
+from typing import Generic, ItemsView, Iterator, KeysView, Optional, TypeVar, ValuesView
+
+from .entry import Entry
+
+E = TypeVar("E", bound=Entry)
+
+
+class Registry(Generic[E]):
+
+    def __init__(self, base: Optional['Registry[E]'] = None):
+        self.base = base
+        self.frozen = False
+        self.entries: dict[str, E] = {}
+        self.by_alias: dict[str, E] = {}
+        # Incremented at every change, so views of the registered entries know when they are outdated
+        self.revision = 0
+        # Entries of the base and the overlay merged, in order, memoized for the revision
+        self.merged: Optional[dict[str, E]] = None
+        self.merged_revision = -1
+
+    def create_overlay(self) -> 'Registry[E]':
+        """
+        :return: An empty registry overriding this one, which must be frozen.
+        """
+        if not self.frozen:
+            raise RegistryException("Overlays can only be created over a frozen registry.")
+        return Registry(self)
+
+    def freeze(self):
+        """
+        Prevents any further registration, so the registry can be shared by overlays.
+        """
+        self.frozen = True
+
+    def register(self, entry: E) -> E:
+        """
+        :param entry: The entry to register, replacing the one with the same name, if any.
+        :return: The registered entry: the given one, or the already registered one if they are identical.
+        """
+        if self.frozen:
+            raise RegistryException(f"Cannot register '{entry.get_name()}', the registry is frozen.")
+        registered = self.get(entry.get_name())
+        if registered is not None and registered.is_same(entry):
+            return registered
+        if entry.get_name() in self.entries:
+            # Kept in place, and the aliases are indexed again, the ones of the new entry last
+            self.entries[entry.get_name()] = entry
+            self.by_alias = {}
+            for other in self.entries.values():
+                if other is not entry:
+                    self.index(other)
+            self.index(entry)
+        else:
+            self.entries[entry.get_name()] = entry
+            self.index(entry)
+        self.revision += 1
+        return entry
+
+    def index(self, entry: E):
+        for key in entry.get_keys():
+            self.by_alias[key] = entry
+
+    def get_entries(self) -> dict[str, E]:
+        """
+        :return: Every entry, by name: the entries of the base, in place of which the overlay ones are, then the new entries of the overlay.
+        """
+        if self.base is None:
+            return self.entries
+        if self.merged is None or self.merged_revision != self.revision:
+            # Updating a dictionary keeps the position of the keys it already has
+            merged = dict(self.base.get_entries())
+            merged.update(self.entries)
+            self.merged = merged
+            self.merged_revision = self.revision
+        return self.merged
+
+    def get(self, name: Optional[str], default: Optional[E] = None) -> Optional[E]:
+        entry = self.entries.get(name)
+        if entry is not None:
+            return entry
+        if self.base is not None:
+            return self.base.get(name, default)
+        return default
+
+    def get_by_alias(self, alias: str) -> Optional[E]:
+        """
+        :param alias: A name or an alias, in any case.
+        """
+        key = alias.lower()
+        entry = self.by_alias.get(key)
+        if entry is not None or self.base is None:
+            return entry
+        entry = self.base.get_by_alias(key)
+        # The aliases of an overridden entry are replaced by the ones of the overriding entry
+        if entry is not None and entry.get_name() in self.entries:
+            return None
+        return entry
+
+    def __getitem__(self, name: str) -> E:
+        entry = self.get(name)
+        if entry is None:
+            raise KeyError(name)
+        return entry
+
+    def __contains__(self, name: object) -> bool:
+        return name in self.entries or (self.base is not None and name in self.base)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.get_entries())
+
+    def __len__(self) -> int:
+        return len(self.get_entries())
+
+    def keys(self) -> KeysView[str]:
+        return self.get_entries().keys()
+
+    def values(self) -> ValuesView[E]:
+        return self.get_entries().values()
+
+    def items(self) -> ItemsView[str, E]:
+        return self.get_entries().items()
+
+
+class RegistryException(Exception):
+    pass
@@ -21,10 +21,11 @@ Please feel free to request any search engine that you would
 like to see supported.
 """
 import re
-from typing import Optional
+from typing import Iterable, Iterator, Optional
 from urllib import parse
 
 from .entry import Entry
+from .registry import Registry
 
 DEFAULT_SEARCH_FIELD = 'q'
 
@@ -33,24 +34,22 @@ NEEDS_LANGUAGE_REGEX = re.compile(r"^http(s)+://.*(?P<hole>\{lang}).*$")
 
 class SearchEngine(Entry):
 
-    all: dict[str, 'SearchEngine'] = {}
+    __slots__ = ("private", "field", "escape", "url_parts", "query_prefix")
 
-    def __new__(cls, name: str, *args, **kwargs):
-        obj = super().__new__(cls)
-        cls.all[name] = obj
-        return obj
-
-    def __init__(self, name: str, url: str, aliases: Optional[list[str]] = None, private: bool = False, field: Optional[str] = None, escape: bool = True):
+    def __init__(self, name: str, url: str, aliases: Optional[Iterable[str]] = None, private: bool = False, field: Optional[str] = None, escape: bool = True):
+        aliases = tuple(aliases) if aliases is not None else ()
+        lower_name = name.lower()
+        if lower_name not in aliases:
+            aliases = (lower_name, *aliases)
         super().__init__(name, url, aliases)
-        lower_name = self.name.lower()
-        if lower_name not in self.aliases:
-            self.aliases.insert(0, lower_name)
-        self.private = private
-        if field is None:
-            self.field = DEFAULT_SEARCH_FIELD
-        else:
-            self.field = field
-        self.escape = escape
+        field = field if field is not None else DEFAULT_SEARCH_FIELD
+        initialize = object.__setattr__
+        initialize(self, "private", private)
+        initialize(self, "field", field)
+        initialize(self, "escape", escape)
+        # Precompiled template: the URL split around its language slots, and the encoded field name
+        initialize(self, "url_parts", tuple(url.split("{lang}")) if NEEDS_LANGUAGE_REGEX.match(url) else (url,))
+        initialize(self, "query_prefix", f"?{parse.quote_plus(field)}=" if escape else f"?{field}=")
 
     def __str__(self) -> str:
         private_string = ", private" if self.is_private() else ""
@@ -62,36 +61,53 @@ class SearchEngine(Entry):
     def is_private(self) -> bool:
         return self.private
 
+    def get_base_url(self, lang: str) -> str:
+        """
+        :param lang: The language to insert in the URL (if it needs one).
+        :return: The URL with the language, followed by the field name, ready for the search terms.
+        """
+        return lang.join(self.url_parts) + self.query_prefix
+
     def format_url(self, terms: str, lang: str) -> str:
         if len(terms) == 0:
             return self.get_url()
-
-        url = self.get_url()
-        if NEEDS_LANGUAGE_REGEX.match(url):
-            url = url.format(lang=lang)
-
         if self.escape:
-            query_string = parse.urlencode({self.field: terms})
-        else:
-            query_string = f"{self.field}={terms}"
-        return f"{url}?{query_string}"
+            terms = parse.quote_plus(terms)
+        return self.get_base_url(lang) + terms
+
+    def format_urls(self, terms_list: Iterable[str], lang: str) -> Iterator[str]:
+        """
+        Formats the URLs of many searches lazily, computing the base URL only once.
+        :param terms_list: The search terms of every search.
+        :param lang: The language to use for all the searches.
+        :return: An iterator over the URLs, in the same order as the terms.
+        """
+        base_url = self.get_base_url(lang)
+        quote = parse.quote_plus if self.escape else str
+        for terms in terms_list:
+            yield base_url + quote(terms) if len(terms) != 0 else self.get_url()
 
 
 class SearchEngineException(Exception):
     pass
 
 
-AOL = SearchEngine("aol", "https://search.aol.com/aol/search")
-ASK = SearchEngine("Ask", "https://www.ask.com/web")
-BING = SearchEngine("Bing", "https://www.bing.com/search")
-BRAVE_SEARCH = SearchEngine("Brave Search", "https://search.brave.com/search", private=True)
-DUCKDUCKGO = SearchEngine("DuckDuckGo", "https://duckduckgo.com/", private=True)
-ECOSIA = SearchEngine("Ecosia", "https://www.ecosia.org/search")
-GOOGLE = SearchEngine("Google", "https://www.google.com/search")
-MOJEEK = SearchEngine("Mojeek", "https://www.mojeek.com/search", private=True)
-QWANT = SearchEngine("Qwant", "https://www.qwant.com/", private=True)
-STARTPAGE = SearchEngine("Startpage", "https://www.startpage.com/search", private=True)
-SWISSCOWS = SearchEngine("Swisscows", "https://swisscows.com/en/web", private=True, field="query")
-WAYBACK_MACHINE = SearchEngine("The Wayback Machine", "https://web.archive.org/web/", escape=False)
-YAHOO = SearchEngine("Yahoo!", "https://{lang}.search.yahoo.com/search")
-YOUTUBE = SearchEngine("YouTube", "https://www.youtube.com/results", aliases=["yt", "ytb"], field="search_query")
\ No newline at end of file
+SEARCH_ENGINES: Registry['SearchEngine'] = Registry()
+
+AOL = SEARCH_ENGINES.register(SearchEngine("aol", "https://search.aol.com/aol/search"))
+ASK = SEARCH_ENGINES.register(SearchEngine("Ask", "https://www.ask.com/web"))
+BING = SEARCH_ENGINES.register(SearchEngine("Bing", "https://www.bing.com/search"))
+BRAVE_SEARCH = SEARCH_ENGINES.register(SearchEngine("Brave Search", "https://search.brave.com/search", private=True))
+DUCKDUCKGO = SEARCH_ENGINES.register(SearchEngine("DuckDuckGo", "https://duckduckgo.com/", aliases=["ddg"], private=True))
+ECOSIA = SEARCH_ENGINES.register(SearchEngine("Ecosia", "https://www.ecosia.org/search"))
+GOOGLE = SEARCH_ENGINES.register(SearchEngine("Google", "https://www.google.com/search"))
+MOJEEK = SEARCH_ENGINES.register(SearchEngine("Mojeek", "https://www.mojeek.com/search", private=True))
+QWANT = SEARCH_ENGINES.register(SearchEngine("Qwant", "https://www.qwant.com/", private=True))
+STARTPAGE = SEARCH_ENGINES.register(SearchEngine("Startpage", "https://www.startpage.com/search", private=True))
+SWISSCOWS = SEARCH_ENGINES.register(SearchEngine("Swisscows", "https://swisscows.com/en/web", private=True, field="query"))
+WAYBACK_MACHINE = SEARCH_ENGINES.register(SearchEngine("The Wayback Machine", "https://web.archive.org/web/", escape=False))
+YAHOO = SEARCH_ENGINES.register(SearchEngine("Yahoo!", "https://{lang}.search.yahoo.com/search"))
+YOUTUBE = SEARCH_ENGINES.register(SearchEngine("YouTube", "https://www.youtube.com/results", aliases=["yt", "ytb"], field="search_query"))
+
+# The custom search engines are registered in the overlay of each configuration
+SEARCH_ENGINES.freeze()
\ No newline at end of file
@@ -0,0 +1,122 @@
+"""
+File containing the search history.
+
+Every search is appended to a JSON lines file, as a visit.
+Entries are ranked by frecency: every visit is worth 1, halved
+every HALF_LIFE seconds, so frequent and recent searches come first.
+When the file grows over COMPACTION_SIZE, it is compacted: the visits
+of each entry are folded into a single line holding its score at the
+time of compaction, and only the MAX_ENTRIES best entries are kept.
+Reads only ever look at the last MAX_READ_SIZE bytes of the file,
+so they are bounded in time and memory whatever its size.
+"""
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+from cache import APP_STATE_DIR
+
+HISTORY_FILE = APP_STATE_DIR / "history.jsonl"
+HALF_LIFE = 7 * 24 * 3600
+COMPACTION_SIZE = 256 * 1024
+MAX_READ_SIZE = 2 * COMPACTION_SIZE
+MAX_ENTRIES = 1000
+
+Record = dict[str, Any]
+KEYS = ("terms", "search_engine", "browser", "language")
+
+
+def get_key(record: 'Record') -> tuple:
+    return tuple(record.get(key) for key in KEYS)
+
+
+class History:
+
+    def __init__(self, file: Path = HISTORY_FILE):
+        self.file = file
+
+    def read_records(self) -> list['Record']:
+        """
+        Reads the last records of the history file.
+        :return: At most MAX_READ_SIZE bytes of records, oldest first.
+        """
+        try:
+            with self.file.open("rb") as f:
+                size = f.seek(0, os.SEEK_END)
+                f.seek(max(0, size - MAX_READ_SIZE))
+                data = f.read(MAX_READ_SIZE)
+        except OSError:
+            return []
+        lines = data.split(b"\n")
+        if size > MAX_READ_SIZE:
+            # The first line is probably truncated
+            lines = lines[1:]
+        records: list['Record'] = []
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(record, dict) and isinstance(record.get("terms"), str):
+                records.append(record)
+        return records
+
+    def get_scores(self, now: Optional[float] = None) -> dict[tuple, tuple[float, 'Record']]:
+        """
+        Computes the frecency score of every entry of the history.
+        :param now: The time at which to compute the scores.
+        :return: The score and the last record of every entry, by key.
+        """
+        now = now if now is not None else time.time()
+        scores: dict[tuple, tuple[float, 'Record']] = {}
+        for record in self.read_records():
+            key = get_key(record)
+            age = max(0.0, now - record.get("time", now))
+            score = record.get("score", 1.0) * 0.5 ** (age / HALF_LIFE)
+            if key in scores:
+                score += scores[key][0]
+            scores[key] = (score, record)
+        return scores
+
+    def get_top(self, count: int) -> list['Record']:
+        """
+        :param count: The maximum number of entries to get.
+        :return: The best ranked entries, best first.
+        """
+        if count <= 0:
+            return []
+        ranked = sorted(self.get_scores().values(), key=lambda item: item[0], reverse=True)
+        return [record for _, record in ranked[:count]]
+
+    def add(self, terms: str, search_engine: str, browser: str, language: str, private: bool):
+        record = {
+            "time": time.time(),
+            "terms": terms,
+            "search_engine": search_engine,
+            "browser": browser,
+            "language": language,
+            "private": private
+        }
+        try:
+            self.file.parent.mkdir(parents=True, exist_ok=True)
+            with self.file.open("a", encoding="utf-8") as f:
+                f.write(json.dumps(record, separators=(",", ":")) + "\n")
+                size = f.tell()
+        except OSError:
+            return
+        if size > COMPACTION_SIZE:
+            self.compact()
+
+    def compact(self):
+        now = time.time()
+        ranked = sorted(self.get_scores(now).values(), key=lambda item: item[0])[-MAX_ENTRIES:]
+        temporary = self.file.with_name(f".{self.file.name}.{os.getpid()}")
+        try:
+            with temporary.open("w", encoding="utf-8") as f:
+                for score, record in ranked:
+                    f.write(json.dumps(dict(record, time=now, score=score), separators=(",", ":")) + "\n")
+            os.replace(temporary, self.file)
+        except OSError:
+            temporary.unlink(missing_ok=True)
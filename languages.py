@@ -0,0 +1,138 @@
+"""
+File containing the language selection menu.
+
+The list of languages is extracted from the locale aliases known
+by Python, which takes a while as there are more than a thousand
+of them. The menu is therefore built once, ranked by how often
+each language was used, and stored pre-rendered in a cache file.
+The cache is only rebuilt when counting a use changes the ranking,
+which is rare once the usual languages are ranked first.
+"""
+import sys
+from typing import Optional
+
+from cache import APP_CACHE_DIR, APP_STATE_DIR, read_cache, write_cache
+
+LANGUAGES_CACHE_FILE = APP_CACHE_DIR / "languages.json"
+LANGUAGE_USAGE_FILE = APP_STATE_DIR / "language_usage.json"
+
+LANGUAGE_NAMES = {
+    "af": "Afrikaans", "am": "Amharic", "ar": "Arabic", "az": "Azerbaijani", "be": "Belarusian",
+    "bg": "Bulgarian", "bn": "Bengali", "bs": "Bosnian", "ca": "Catalan", "cs": "Czech",
+    "cy": "Welsh", "da": "Danish", "de": "German", "el": "Greek", "en": "English",
+    "eo": "Esperanto", "es": "Spanish", "et": "Estonian", "eu": "Basque", "fa": "Persian",
+    "fi": "Finnish", "fo": "Faroese", "fr": "French", "fy": "Western Frisian", "ga": "Irish",
+    "gd": "Scottish Gaelic", "gl": "Galician", "gu": "Gujarati", "he": "Hebrew", "hi": "Hindi",
+    "hr": "Croatian", "ht": "Haitian Creole", "hu": "Hungarian", "hy": "Armenian", "id": "Indonesian",
+    "is": "Icelandic", "it": "Italian", "ja": "Japanese", "ka": "Georgian", "kk": "Kazakh",
+    "km": "Khmer", "kn": "Kannada", "ko": "Korean", "ku": "Kurdish", "ky": "Kyrgyz",
+    "lb": "Luxembourgish", "lo": "Lao", "lt": "Lithuanian", "lv": "Latvian", "mg": "Malagasy",
+    "mi": "Maori", "mk": "Macedonian", "ml": "Malayalam", "mn": "Mongolian", "mr": "Marathi",
+    "ms": "Malay", "mt": "Maltese", "my": "Burmese", "nb": "Norwegian Bokmål", "ne": "Nepali",
+    "nl": "Dutch", "nn": "Norwegian Nynorsk", "no": "Norwegian", "oc": "Occitan", "pa": "Punjabi",
+    "pl": "Polish", "ps": "Pashto", "pt": "Portuguese", "ro": "Romanian", "ru": "Russian",
+    "rw": "Kinyarwanda", "sd": "Sindhi", "si": "Sinhala", "sk": "Slovak", "sl": "Slovenian",
+    "so": "Somali", "sq": "Albanian", "sr": "Serbian", "sv": "Swedish", "sw": "Swahili",
+    "ta": "Tamil", "te": "Telugu", "tg": "Tajik", "th": "Thai", "tk": "Turkmen",
+    "tl": "Tagalog", "tr": "Turkish", "tt": "Tatar", "ug": "Uyghur", "uk": "Ukrainian",
+    "ur": "Urdu", "uz": "Uzbek", "vi": "Vietnamese", "wa": "Walloon", "xh": "Xhosa",
+    "yi": "Yiddish", "yo": "Yoruba", "zh": "Chinese", "zu": "Zulu",
+}
+
+
+def get_locale_languages() -> list[str]:
+    """
+    Extracts the 2 characters language codes from the locale aliases.
+    :return: The sorted list of language codes.
+    """
+    from locale import locale_alias
+
+    all_languages: set[str] = set()
+    for alias in locale_alias.keys():
+        lang = alias[:2]
+        if lang.isalpha() and len(lang.lstrip()) == 2:
+            all_languages.add(lang)
+    return sorted(all_languages)
+
+
+def is_reranked(usage: dict[str, int], language: str) -> bool:
+    """
+    :param usage: The number of uses of every language, not counting the new use yet.
+    :return: True if counting one more use of the language changes the ranking (by usage, then code).
+    """
+    count = usage.get(language, 0)
+    if count == 0:
+        # Moves ahead of every unused language, which are not in the usage statistics
+        return True
+    return any(
+        (other_count == count + 1 and other > language) or (other_count == count and other < language)
+        for other, other_count in usage.items()
+    )
+
+
+class LanguageMenu:
+
+    def __init__(self, aliases_color: str):
+        self.aliases_color = aliases_color
+        self.codes: tuple[str, ...] = ()
+        self.payloads: dict[str, str] = {}
+        self.loaded = False
+
+    def get_key(self) -> list:
+        return [sys.version, self.aliases_color]
+
+    def load(self):
+        if self.loaded:
+            return
+        self.loaded = True
+        data = read_cache(LANGUAGES_CACHE_FILE)
+        if isinstance(data, dict) and data.get("key") == self.get_key():
+            self.codes = tuple(data["codes"])
+            self.payloads = data["payloads"]
+        else:
+            self.build()
+
+    def build(self, codes: Optional[tuple[str, ...]] = None):
+        """
+        Ranks the languages by usage and renders the menu, then stores it in the cache.
+        :param codes: The language codes, extracted from the locale aliases if not given.
+        """
+        usage = read_cache(LANGUAGE_USAGE_FILE)
+        usage = usage if isinstance(usage, dict) else {}
+        codes = codes if codes is not None else get_locale_languages()
+        self.codes = tuple(sorted(codes, key=lambda code: (-usage.get(code, 0), code)))
+        rows = [
+            f'{code} <span color="{self.aliases_color}">{LANGUAGE_NAMES.get(code, "")}</span>'
+            for code in self.codes
+        ]
+        self.payloads = {
+            "dmenu": "\n".join(rows),
+            "script": "\n".join(f"{row}\0info\x1f{code}" for row, code in zip(rows, self.codes))
+        }
+        write_cache(LANGUAGES_CACHE_FILE, {"key": self.get_key(), "codes": self.codes, "payloads": self.payloads})
+
+    def get_codes(self) -> tuple[str, ...]:
+        self.load()
+        return self.codes
+
+    def get_payload(self, backend: str) -> str:
+        """
+        Gets the pre-rendered rows of the menu.
+        :param backend: The backend displaying the menu ("dmenu" or "script").
+        :return: The rows, separated by newlines.
+        """
+        self.load()
+        return self.payloads[backend]
+
+    def record_usage(self, language: str):
+        """
+        Counts one more use of the given language, and re-ranks the cached menu if the ranking changes.
+        """
+        usage = read_cache(LANGUAGE_USAGE_FILE)
+        usage = usage if isinstance(usage, dict) else {}
+        reranked = is_reranked(usage, language)
+        usage[language] = usage.get(language, 0) + 1
+        write_cache(LANGUAGE_USAGE_FILE, usage)
+        if reranked:
+            self.load()
+            self.build(self.codes)
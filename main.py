@@ -1,21 +1,43 @@
 #!/usr/bin/env python3
+# First, to time the other imports
+from tracing import IMPORTS_START, TRACER, get_trace_destination
+
+import json
 import os
-import shutil
-import subprocess
 import sys
-from argparse import ArgumentParser, Namespace
+import time
+from contextlib import redirect_stdout
 from enum import IntEnum
-from locale import locale_alias
 from pathlib import Path
-from subprocess import CompletedProcess
-from typing import Optional, Iterable
+from typing import TYPE_CHECKING, Any, NamedTuple, Optional, Iterable, Sequence
 
-from cli import arguments
-from config import Configuration, ConfigLocation, GlobalConfigParser, APP_XDG_CONFIG_DIR, APP_DOT_DIR, XDG_CONFIG_DIR, get_user_config
+from cli import parse_arguments
+from config import Configuration, ConfigLocation, GlobalConfigParser, SourceGraph, APP_XDG_CONFIG_DIR, APP_DOT_DIR, XDG_CONFIG_DIR, FILESYSTEM_CALLS, find_user_config, get_cached_user_config, load_cached_configuration, read_configuration_cache, save_configuration_cache
+from entries.browser import Browser, BrowserException
+from entries.executable import EXECUTABLES
 from entries.search_engine import SearchEngine
+from history import History, Record
+from languages import LanguageMenu
+from suggestions import SuggestionIndex
+from script import BROWSERS_MENU, LANGUAGES_MENU, MODE_NAME, SCRIPT_ARGUMENTS_ENV, SCRIPT_TIMINGS_ENV, SEARCH_ENGINES_MENU, SEARCH_MENU, ScriptMenu, get_script_command, get_script_environment, is_script_call
+from stats import PERCENTILES, TIMINGS, LaunchRecord, StatisticsStore, get_percentiles
+
+if TYPE_CHECKING:
+    from argparse import Namespace
+    from subprocess import CompletedProcess
+
+IMPORTS_END = time.monotonic()
 
 DEFAULT_ENCODING = "utf-8"
 FLAG = object()
+BROWSER_PREFIX = "@"
+SEARCH_ENGINE_PREFIX = "!"
+# Maximum number of suggestions shown in the search menu, when no past search is shown
+MENU_SUGGESTIONS = 10
+# Maximum number of terms printed by --complete
+MAX_COMPLETIONS = 20
+# Custom keybindings (rofi exit codes) opening a menu
+MENU_KEYS = {10: BROWSERS_MENU, 11: SEARCH_ENGINES_MENU, 13: LANGUAGES_MENU}
 
 
 class ExitCode(IntEnum):
@@ -23,18 +45,25 @@ class ExitCode(IntEnum):
     WRONG_CONFIG_PATH = 1
     INCORRECT_CONFIG = 2
     ROFI_ERROR = 3
+    BROWSER_ERROR = 4
+    DAEMON_ERROR = 5
+    WRONG_BATCH_FILE = 6
 
 
-def get_rofi_exec() -> list[str]:
-    rofi_exec = "rofi"
-    if os.getenv("XDG_SESSION_TYPE") == "wayland":
-        rofi_exec = "wofi"
+def get_rofi_exec(frontend: Optional[str] = None) -> list[str]:
+    rofi_exec = frontend
+    if rofi_exec is None:
+        rofi_exec = "rofi"
+        if os.getenv("XDG_SESSION_TYPE") == "wayland":
+            rofi_exec = "wofi"
     return [rofi_exec, "-dmenu"]
 
 
-def spawn_rofi(*options, flags: Optional[set[str]] = None, _debug: bool = False, **kwargs) -> CompletedProcess:
-    command: list[str] = get_rofi_exec()
+def supports_script_mode(frontend: Optional[str] = None) -> bool:
+    return Path(get_rofi_exec(frontend)[0]).name == "rofi"
+
 
+def add_rofi_options(command: list[str], flags: Optional[set[str]] = None, **kwargs) -> list[str]:
     flags = flags if flags is not None else set()
     flags.add("no_sort")
     for flag in flags:
@@ -46,142 +75,412 @@ def spawn_rofi(*options, flags: Optional[set[str]] = None, _debug: bool = False,
         command.append("-{}".format(k.replace("_", "-")))
         if v is not FLAG:
             command.append(str(v))
+    return command
+
+
+def spawn_rofi(*options, flags: Optional[set[str]] = None, _debug: bool = False, _frontend: Optional[str] = None, **kwargs) -> 'CompletedProcess':
+    import subprocess
+
+    command = add_rofi_options(get_rofi_exec(_frontend), flags, **kwargs)
     stdin = "\n".join(options).encode(DEFAULT_ENCODING)
     if _debug:
         print(subprocess.list2cmdline(command))
-    return subprocess.run(command, capture_output=True, input=stdin)
+    return run_rofi(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE, input=stdin)
+
+
+def run_rofi(command: list[str], input: Optional[bytes] = None, **kwargs) -> 'CompletedProcess':
+    """
+    Runs rofi, tracing separately the start of the process and the wait for the user.
+    """
+    import subprocess
+
+    TIMINGS.set_menu_opened(Path(command[0]).name)
+    with TRACER.phase("rofi.start", executable=command[0]):
+        process = subprocess.Popen(command, **kwargs)
+    with TRACER.phase("rofi.wait", executable=command[0]), process:
+        stdout, stderr = process.communicate(input)
+    TIMINGS.set_input()
+    return subprocess.CompletedProcess(command, process.returncode, stdout, stderr)
+
+
+class MenuPayload(NamedTuple):
+    prompt: str
+    message: str
+    rows: list[str]
+    values: Sequence
+    options: dict[str, Any]
 
 
 class Application:
 
-    def __init__(self, config: 'Configuration'):
+    def __init__(self, config: 'Configuration', detach: bool = False):
         self.config = config
-        self.browser = self.config.browsers.get_browser()
-        self.search_engine = self.config.search_engines.get_search_engine()
+        self.detach = detach
+        with TRACER.phase("application"):
+            self.browser = self.config.browsers.get_browser()
+            self.search_engine = self.config.search_engines.get_search_engine()
+            self.additional_search_engines = list(self.config.search_engines.get_additional())
+        TIMINGS.set_ready()
         self.private = self.config.main.is_private_search_enabled()
         self.language = self.config.main.get_language()
+        self.languages = LanguageMenu(self.config.customization.get_aliases_color())
+        self.history = History()
+        self.suggestions: Optional['SuggestionIndex'] = None
         self.terms = ""
-
-    def handle_return_code(self, return_code: int, current_menu: int = 0) -> 'ExitCode':
-        match return_code:
-            case 0:
-                return self.run()
-            case 1:
-                if current_menu == 0:
-                    return ExitCode.SUCCESS
-                return self.run()
-            case 10:
-                return self.select_browser()
-            case 11:
-                return self.select_search_engine()
-            case 12:
-                self.toggle_privacy()
-                return self.handle_return_code(current_menu, current_menu)
-            case 13:
-                return self.select_language()
-            case _:
-                if 10 <= return_code <= 28:
-                    return self.handle_return_code(current_menu, current_menu)
-        return ExitCode.ROFI_ERROR
-
-    def make_menu(self, prompt: str, message: str, entries: Optional[Iterable[str]] = None, **kwargs) -> CompletedProcess:
+        self.menu_rows: dict[int, tuple[Any, list[str], Sequence]] = {}
+
+    def handle_return_code(self, return_code: int, current_menu: int = SEARCH_MENU) -> Optional[int]:
+        """
+        Gets the menu to show after rofi exited with the given code (other than a selection).
+        :param return_code: The exit code of rofi: 1 when closed, 10-28 for custom keybindings.
+        :param current_menu: The menu rofi was showing.
+        :return: The next menu, or None to exit.
+        """
+        if return_code == 1:
+            return None if current_menu == SEARCH_MENU else SEARCH_MENU
+        elif return_code == 12:
+            self.toggle_privacy()
+            return current_menu
+        elif return_code in MENU_KEYS:
+            return MENU_KEYS[return_code]
+        elif 10 <= return_code <= 28:
+            return current_menu
+        return None
+
+    def get_keybindings(self) -> dict[str, Optional[str]]:
+        return {
+            "kb_custom_1": self.config.customization.get_kb_browsers(),
+            "kb_custom_2": self.config.customization.get_kb_search_engines(),
+            "kb_custom_3": self.config.customization.get_kb_toggle_private(),
+            "kb_custom_4": self.config.customization.get_kb_change_language(),
+            "kb_custom_5": self.config.customization.get_kb_add_search_engine()
+        }
+
+    def make_menu(self, prompt: str, message: str, entries: Optional[Iterable[str]] = None, **kwargs) -> 'CompletedProcess':
         entries = entries if entries is not None else []
         return spawn_rofi(
             *entries,
             p=prompt,
             mesg=message,
-            kb_custom_1=self.config.customization.get_kb_browsers(),
-            kb_custom_2=self.config.customization.get_kb_search_engines(),
-            kb_custom_3=self.config.customization.get_kb_toggle_private(),
             config=self.config.customization.rofi_config,
             _debug=self.config.debug,
+            _frontend=self.config.customization.get_frontend(),
+            **self.get_keybindings(),
             **kwargs
         )
 
-    def print(self, terms: str, url: str, private: bool):
+    def get_browsers(self) -> tuple['Browser', ...]:
+        return self.config.browsers.get_all(exclude=self.browser)
+
+    def get_search_engines(self) -> tuple['SearchEngine', ...]:
+        return self.config.search_engines.get_all(exclude=self.search_engine)
+
+    def get_history(self) -> list['Record']:
+        """
+        Gets the entries to show in the search menu: the best ranked past searches,
+        or if there are none to show, the best scored past terms (as suggestions, filtered by rofi while typing),
+        at most MENU_SUGGESTIONS of them. As rofi picks a matching row over the typed text,
+        the suggestions are kept few, and never added to the past searches.
+        Suggestions only contain the terms, and are searched with the current search engine and browser.
+        """
+        if not self.config.history.is_enabled():
+            return []
+        records = self.history.get_top(self.config.history.get_size())
+        if len(records) == 0 and self.config.history.has_suggestions():
+            return [{"terms": terms} for terms in self.get_suggestions().complete("", MENU_SUGGESTIONS)]
+        return records
+
+    def get_history_entry(self, record: 'Record') -> str:
+        from html import escape
+
+        if "search_engine" not in record:
+            return escape(record["terms"])
+        return f'{escape(record["terms"])} <span color="{self.config.customization.get_aliases_color()}">{escape(record["search_engine"])}</span>'
+
+    def get_suggestions(self) -> 'SuggestionIndex':
+        if self.suggestions is None:
+            self.suggestions = SuggestionIndex.load(self.history)
+        return self.suggestions
+
+    def get_browser_message(self) -> str:
+        return f"Your current browser is {self.browser.get_name()}."
+
+    def get_selected_search_engines(self) -> list['SearchEngine']:
+        """
+        :return: The main search engine, followed by the additional ones (searched in other tabs).
+        """
+        selected = [self.search_engine]
+        for search_engine in self.additional_search_engines:
+            if search_engine not in selected:
+                selected.append(search_engine)
+        return selected
+
+    def get_search_engines_names(self) -> str:
+        return ", ".join(se.get_name() for se in self.get_selected_search_engines())
+
+    def toggle_additional_search_engine(self, search_engine: 'SearchEngine'):
+        if search_engine in self.additional_search_engines:
+            self.additional_search_engines.remove(search_engine)
+        elif search_engine is not self.search_engine:
+            self.additional_search_engines.append(search_engine)
+
+    def get_search_engine_message(self) -> str:
+        if len(self.get_selected_search_engines()) > 1:
+            return f"Your current search engines are {self.get_search_engines_names()}."
+        return f"Your current search engine is {self.search_engine.get_name()}."
+
+    def get_language_message(self) -> str:
+        return f"Your current language is [{self.language}]"
+
+    def get_search_message(self) -> str:
+        private_status = " [privately]" if self.private else ""
+        return f"Search{private_status} on {self.get_search_engines_names()} using {self.browser.get_name()}."
+
+    def print(self, terms: str, urls: list[str], private: bool):
         column_string = "{:15}{}"
         print(column_string.format("NAME", "VALUE"))
         print(column_string.format("browser", self.browser.get_name()))
-        print(column_string.format("search-engine", self.search_engine.get_name()))
+        print(column_string.format("search-engine", self.get_search_engines_names()))
         print(column_string.format("language", self.language))
         print(column_string.format("terms", terms))
-        print(column_string.format("url", url))
+        for url in urls:
+            print(column_string.format("url", url))
         print(column_string.format("private-search", "yes" if private else "no"))
 
-    def search(self, terms: str):
-        url = self.search_engine.format_url(terms, self.language)
+    def resolve_aliases(self, terms: str) -> str:
+        """
+        Selects the browser and/or the search engine(s) from aliases at the start of the terms,
+        e.g. "@librewolf !yt cats" searches "cats" on YouTube using Librewolf,
+        and "!ddg !yt cats" searches "cats" on both DuckDuckGo and YouTube.
+        Unknown aliases, and aliases of browsers or search engines hidden by the configuration,
+        are left in the terms (e.g. to use DuckDuckGo's bangs).
+        :param terms: The search terms, possibly starting with aliases.
+        :return: The search terms without the resolved aliases, the others left as they were typed.
+        """
+        browsers, search_engines = self.config.browsers, self.config.search_engines
+        selected: list['SearchEngine'] = []
+        rest = terms
+        while True:
+            parts = rest.split(maxsplit=1)
+            if len(parts) == 0:
+                break
+            word = parts[0]
+            browser = browsers.registry.get_by_alias(word[1:]) if word.startswith(BROWSER_PREFIX) else None
+            search_engine = search_engines.registry.get_by_alias(word[1:]) if word.startswith(SEARCH_ENGINE_PREFIX) else None
+            if browser is not None and not browser.is_installed():
+                raise BrowserException(f"Browser '{browser.get_name()}' is not installed on your machine or not in $PATH.")
+            if browser is not None and browsers.is_valid(browser, browsers.get_filter()):
+                self.browser = browser
+            elif search_engine is not None and search_engines.is_valid(search_engine, search_engines.get_filter()):
+                selected.append(search_engine)
+            else:
+                break
+            rest = parts[1] if len(parts) == 2 else ""
+        if len(selected) != 0:
+            self.search_engine = selected[0]
+            self.additional_search_engines = selected[1:]
+        return rest
+
+    def search(self, terms: str) -> 'ExitCode':
+        try:
+            terms = self.resolve_aliases(terms)
+        except BrowserException as e:
+            print(e, file=sys.stderr)
+            return ExitCode.BROWSER_ERROR
+        urls = [search_engine.format_url(terms, self.language) for search_engine in self.get_selected_search_engines()]
         if self.config.debug:
-            self.print(terms, url, self.private)
+            self.print(terms, urls, self.private)
+            return ExitCode.SUCCESS
+        try:
+            TIMINGS.set_browser_launched(self.browser.get_name())
+            max_urls = self.browser.get_max_urls()
+            for start in range(0, len(urls), max_urls):
+                self.browser.spawn_batch(urls[start:start + max_urls], self.private, detach=self.detach)
+        except BrowserException as e:
+            print(e, file=sys.stderr)
+            return ExitCode.BROWSER_ERROR
+        self.languages.record_usage(self.language)
+        if self.config.history.is_enabled() and len(terms) != 0 and (not self.private or self.config.history.is_private_included()):
+            suggestions = self.get_suggestions()
+            self.history.add(terms, self.search_engine.get_name(), self.browser.get_name(), self.language, self.private)
+            suggestions.record(terms, self.history)
+        return ExitCode.SUCCESS
+
+    def search_batch(self, lines: Iterable[str]) -> 'ExitCode':
+        """
+        Searches every line (which may start with aliases), opening the URLs
+        in as few browser commands as possible. At most Browser.get_max_urls() URLs
+        per browser are kept in memory, whatever the number of lines.
+        In debug mode, prints the commands instead of running them.
+        :param lines: The search terms, one search per line.
+        """
+        browser, search_engine, additional = self.browser, self.search_engine, self.additional_search_engines
+        batches: dict['Browser', list[str]] = {}
+        exit_code = ExitCode.SUCCESS
+
+        def flush(batch_browser: 'Browser'):
+            nonlocal exit_code
+            urls = batches.pop(batch_browser)
+            if self.config.debug:
+                from subprocess import list2cmdline
+
+                print(list2cmdline(batch_browser.get_batch_command(urls, self.private)))
+                return
+            try:
+                batch_browser.spawn_batch(urls, self.private, detach=self.detach)
+            except BrowserException as e:
+                print(e, file=sys.stderr)
+                exit_code = ExitCode.BROWSER_ERROR
+
+        for line in lines:
+            self.browser, self.search_engine, self.additional_search_engines = browser, search_engine, additional
+            try:
+                terms = self.resolve_aliases(line.strip())
+            except BrowserException as e:
+                print(e, file=sys.stderr)
+                exit_code = ExitCode.BROWSER_ERROR
+                continue
+            if len(terms) == 0:
+                continue
+            for selected in self.get_selected_search_engines():
+                urls = batches.setdefault(self.browser, [])
+                urls.append(selected.format_url(terms, self.language))
+                if len(urls) >= self.browser.get_max_urls():
+                    flush(self.browser)
+        for batch_browser in list(batches.keys()):
+            flush(batch_browser)
+        self.browser, self.search_engine, self.additional_search_engines = browser, search_engine, additional
+        return exit_code
+
+    def search_again(self, record: 'Record') -> 'ExitCode':
+        """
+        Searches again an entry of the history, with the same search engine, browser and language
+        (the current ones are used for suggestions).
+        """
+        search_engines = self.config.search_engines.registry
+        if record.get("search_engine") in search_engines:
+            self.search_engine = search_engines[record["search_engine"]]
+            self.additional_search_engines = []
+        self.browser = self.config.browsers.registry.get(record.get("browser"), self.browser)
+        self.language = record.get("language", self.language)
+        return self.search(record["terms"])
+
+    def get_menu_rows(self, menu: int) -> tuple[list[str], Sequence]:
+        """
+        Gets the rows of a menu, and the value of every row.
+        They are memoized per menu, as long as the state they depend on does not change,
+        so switching back and forth between menus does not rebuild them.
+        """
+        key = self.browser if menu == BROWSERS_MENU else self.search_engine if menu == SEARCH_ENGINES_MENU else None
+        memoized = self.menu_rows.get(menu)
+        if memoized is not None and memoized[0] is key:
+            return memoized[1], memoized[2]
+
+        aliases_color = self.config.customization.get_aliases_color()
+        if menu == BROWSERS_MENU:
+            values = self.get_browsers()
+            rows = [b.get_entry(aliases_color) for b in values]
+        elif menu == SEARCH_ENGINES_MENU:
+            values = self.get_search_engines()
+            rows = [se.get_entry(aliases_color) for se in values]
+        elif menu == LANGUAGES_MENU:
+            values = self.languages.get_codes()
+            rows = [self.languages.get_payload("dmenu")]
         else:
-            self.browser.spawn(url, self.private)
-
-    def select_browser(self) -> 'ExitCode':
-        browsers = self.config.browsers.get_all()
-        if self.browser in browsers:
-            browsers.remove(self.browser)
-        process = self.make_menu(
-            '',
-            f"Your current browser is {self.browser.get_name()}.",
-            (b.get_entry(self.config.customization.get_aliases_color()) for b in browsers),
-            format='i',
-            markup_rows=FLAG
-        )
-        if process.returncode == 0:
-            self.browser = browsers[int(process.stdout.decode(DEFAULT_ENCODING).strip())]
-            return self.run()
-        return self.handle_return_code(process.returncode, current_menu=10)
-
-    def select_search_engine(self) -> 'ExitCode':
-        search_engines = self.config.search_engines.get_all()
-        if self.search_engine in search_engines:
-            search_engines.remove(self.search_engine)
-        process = self.make_menu(
-            '󰖟',
-            f"Your current search engine is {self.search_engine.get_name()}.",
-            (se.get_entry(self.config.customization.get_aliases_color()) for se in search_engines),
-            format='i',
-            markup_rows=FLAG
-        )
-        if process.returncode == 0:
-            self.search_engine = search_engines[int(process.stdout.decode(DEFAULT_ENCODING).strip())]
-            return self.run()
-        return self.handle_return_code(process.returncode, current_menu=11)
-
-    def select_language(self) -> 'ExitCode':
-        all_languages: set[str] = set()
-        for alias in locale_alias.keys():
-            lang = alias[:2]
-            is_valid = lang.isalpha() and len(lang.lstrip()) == 2
-            if lang != self.language and is_valid:
-                all_languages.add(lang)
-        process = self.make_menu(
-            '󰗊',
-            f"Your current language is [{self.language}]",
-            sorted(all_languages)
-        )
-        if process.returncode == 0:
-            self.language = process.stdout.decode(DEFAULT_ENCODING).strip()
-            return self.run()
-        return self.handle_return_code(process.returncode, current_menu=13)
+            values = self.get_history()
+            rows = [self.get_history_entry(record) for record in values]
+        self.menu_rows[menu] = (key, rows, values)
+        return rows, values
+
+    def get_menu_payload(self, menu: int) -> 'MenuPayload':
+        rows, values = self.get_menu_rows(menu)
+        if menu == BROWSERS_MENU:
+            return MenuPayload('', self.get_browser_message(), rows, values, {"format": 'i', "markup_rows": FLAG})
+        elif menu == SEARCH_ENGINES_MENU:
+            return MenuPayload('󰖟', self.get_search_engine_message(), rows, values, {"format": 'i', "markup_rows": FLAG, "multi_select": FLAG})
+        elif menu == LANGUAGES_MENU:
+            return MenuPayload('󰗊', self.get_language_message(), rows, values, {"format": 'i f', "markup_rows": FLAG})
+        listview = "" if len(rows) != 0 else " listview { enabled: false; }"
+        return MenuPayload('', self.get_search_message(), rows, values, {
+            "filter": self.terms,
+            "format": 's',
+            "markup_rows": FLAG if len(rows) != 0 else None,
+            "theme_str": f"window {{ width: {self.config.customization.get_width()}%; }}{listview}"
+        })
+
+    def select(self, menu: int, selection: str, values: Sequence):
+        """
+        Applies the row(s) selected in a menu (other than the search menu).
+        :param selection: The output of rofi: the index of every selected row, one per line
+        (-1 for a custom input, followed by the input in the languages menu).
+        """
+        if menu == LANGUAGES_MENU:
+            index, _, custom = selection.strip().partition(" ")
+            if index == "-1":
+                if len(custom.strip()) != 0:
+                    self.language = custom.strip()
+            elif index.isdigit():
+                self.language = values[int(index)]
+            return
+        indices = [int(index) for index in selection.split() if index != "-1"]
+        if len(indices) == 0:
+            return
+        if menu == BROWSERS_MENU:
+            self.browser = values[indices[0]]
+        elif menu == SEARCH_ENGINES_MENU:
+            self.search_engine = values[indices[0]]
+            self.additional_search_engines = [values[index] for index in indices[1:]]
 
     def toggle_privacy(self):
         self.private = not self.private
 
     def run(self) -> 'ExitCode':
-        private_status = " [privately]" if self.private else ""
-        process = self.make_menu(
-            '',
-            f"Search{private_status} on {self.search_engine.get_name()} using {self.browser.get_name()}.",
-            filter=self.terms,
-            format='s',
-            theme_str=f"window {{ width: {self.config.customization.get_width()}%; }} listview {{ enabled: false; }}"
+        """
+        Shows the menus until a search is made, or the search menu is closed.
+        Menus are switched in a loop, so a session can be as long as needed
+        without growing the stack.
+        """
+        menu = SEARCH_MENU
+        while True:
+            payload = self.get_menu_payload(menu)
+            process = self.make_menu(payload.prompt, payload.message, payload.rows, **payload.options)
+            if process.returncode == 0:
+                selection = process.stdout.decode(DEFAULT_ENCODING)
+                if menu != SEARCH_MENU:
+                    self.select(menu, selection, payload.values)
+                    menu = SEARCH_MENU
+                    continue
+                selection = selection.strip()
+                history = dict(zip(payload.rows, payload.values))
+                if selection in history:
+                    return self.search_again(history[selection])
+                return self.search(selection)
+            next_menu = self.handle_return_code(process.returncode, menu)
+            if next_menu is None:
+                return ExitCode.SUCCESS if process.returncode == 1 else ExitCode.ROFI_ERROR
+            menu = next_menu
+
+    def run_script_mode(self, argv: list[str]) -> 'ExitCode':
+        """
+        Runs every menu inside a single rofi process, using rofi-search as a rofi script mode.
+        :param argv: The command line arguments, given to every call of the script.
+        """
+        command = add_rofi_options(
+            [get_rofi_exec(self.config.customization.get_frontend())[0], "-show", MODE_NAME, "-modi", f"{MODE_NAME}:{get_script_command()}"],
+            config=self.config.customization.rofi_config,
+            theme_str=f"window {{ width: {self.config.customization.get_width()}%; }}",
+            **self.get_keybindings()
         )
-        if process.returncode == 0:
-            self.search(process.stdout.decode(DEFAULT_ENCODING).strip())
-            return ExitCode.SUCCESS
-        elif process.returncode == 1:
-            return ExitCode.SUCCESS
-        return self.handle_return_code(process.returncode)
+        if self.config.debug:
+            from subprocess import list2cmdline
+
+            print(list2cmdline(command))
+        # The script call starting the browser stores the statistics of the whole launch
+        TIMINGS.set_menu_opened(Path(command[0]).name)
+        process = run_rofi(command, env=get_script_environment(argv, TIMINGS.delegate()))
+        if process.returncode not in (0, 1):
+            return ExitCode.ROFI_ERROR
+        return ExitCode.SUCCESS
 
 
 def print_browsers(config: 'Configuration') -> 'ExitCode':
@@ -199,10 +498,28 @@ def print_browsers(config: 'Configuration') -> 'ExitCode':
     return ExitCode.SUCCESS
 
 
+def run_batch(app: 'Application', file: str) -> 'ExitCode':
+    if file == "-":
+        return app.search_batch(sys.stdin)
+    try:
+        f = open(file, "r", encoding=DEFAULT_ENCODING)
+    except OSError as e:
+        print(f"Could not read '{file}': {e.strerror}.", file=sys.stderr)
+        return ExitCode.WRONG_BATCH_FILE
+    with f:
+        return app.search_batch(f)
+
+
+def print_completions(app: 'Application', prefix: str) -> 'ExitCode':
+    for terms in app.get_suggestions().complete(prefix, MAX_COMPLETIONS):
+        print(terms)
+    return ExitCode.SUCCESS
+
+
 def print_search_engines(config: 'Configuration') -> 'ExitCode':
     column_string = "{:20}{:14}{}"
     print(column_string.format("SEARCH-ENGINE", "IS-PRIVATE", "URL"))
-    for name, search_engine in SearchEngine.all.items():
+    for name, search_engine in config.search_engines.registry.items():
         print(column_string.format(
             name,
             "yes" if search_engine.is_private() else "no",
@@ -211,7 +528,42 @@ def print_search_engines(config: 'Configuration') -> 'ExitCode':
     return ExitCode.SUCCESS
 
 
+def print_statistics(store: 'StatisticsStore') -> 'ExitCode':
+    records = store.read()
+    if len(records) == 0:
+        print(f"No statistics yet ({store.file}).")
+        return ExitCode.SUCCESS
+    groups: dict[str, list['LaunchRecord']] = {"all": records}
+    for record in records:
+        if record.frontend:
+            groups.setdefault(f"frontend: {record.frontend}", []).append(record)
+        if record.browser:
+            groups.setdefault(f"browser: {record.browser}", []).append(record)
+
+    column_string = "{:26}{:12}{:>8}" + "{:>12}" * len(PERCENTILES)
+    print(f"{len(records)} launches ({store.file})")
+    print(column_string.format("GROUP", "PHASE", "COUNT", *(f"P{p} (ms)" for p in PERCENTILES)))
+    for group, group_records in groups.items():
+        for phase, percentiles in get_percentiles(group_records).items():
+            if percentiles is None:
+                continue
+            count, values = percentiles
+            print(column_string.format(group, phase, count, *(f"{value * 1000:.1f}" for value in values)))
+    return ExitCode.SUCCESS
+
+
+def save_statistics(config: 'Configuration'):
+    if not config.debug and TIMINGS.is_interactive() and not TIMINGS.delegated:
+        StatisticsStore().add(TIMINGS.get_record())
+
+
+def print_cache_statistics():
+    print(f"Executable cache: {EXECUTABLES.hits} hits, {EXECUTABLES.misses} misses ({EXECUTABLES.file})", file=sys.stderr)
+
+
 def copy_default_config(destination: Path) -> 'ExitCode':
+    import shutil
+
     source = Path(os.path.dirname(__file__))
     if destination.exists() and destination.is_file():
         backup = destination.with_suffix(".old.toml")
@@ -232,43 +584,161 @@ def make_init_config() -> 'ExitCode':
     return copy_default_config(APP_DOT_DIR / "config.toml")
 
 
-def load_config(args: 'Namespace') -> 'Configuration':
-    config = Configuration(debug=args.debug)
-
-    # Load user configuration
-    user_config = get_user_config()
-    if user_config is not None:
-        GlobalConfigParser.from_location(config, user_config).load()
+def load_file_config(args: 'Namespace') -> 'Configuration':
+    start = time.monotonic()
+    cache = read_configuration_cache()
+    user_config = get_cached_user_config(cache)
+    cached_location = user_config is not None
+    if user_config is None:
+        user_config = find_user_config()
 
-    # Load configuration file given through CLI
+    # User configuration, then configuration file given through CLI
+    roots: list[Path] = []
+    if user_config.file is not None:
+        roots.append(user_config.file)
     if args.configuration_file is not None:
-        location = ConfigLocation(Path(args.configuration_file))
-        GlobalConfigParser.from_location(config, location).load()
+        roots.append(ConfigLocation(Path(args.configuration_file)).get_config_file())
+
+    config = load_cached_configuration(cache, roots, args.debug)
+    cached_config = config is not None
+    if config is None:
+        config = Configuration(debug=args.debug)
+        for source in SourceGraph(config.debug).load(roots):
+            config.load(source.file)
+            GlobalConfigParser(config, source.data, str(source.file)).load()
+        save_configuration_cache(config, roots, user_config)
+    config.user_config = user_config
+    TRACER.record(
+        "config.files",
+        start,
+        time.monotonic(),
+        cached_location=cached_location,
+        cached_config=cached_config,
+        listings=FILESYSTEM_CALLS.listings,
+        stats=FILESYSTEM_CALLS.stats
+    )
+    return config
+
+
+def load_config(args: 'Namespace', base: Optional['Configuration'] = None) -> 'Configuration':
+    """
+    Loads the configuration files, then the command line arguments.
+    :param args: The parsed command line arguments.
+    :param base: Already loaded configuration files (used by the daemon), ignored if a configuration file is given.
+    :return: The loaded configuration.
+    """
+    start = time.monotonic()
+    with TRACER.phase("load_config"):
+        if base is not None and args.configuration_file is None:
+            config = base
+            config.debug = args.debug
+        else:
+            config = load_file_config(args)
+        EXECUTABLES.set_catalog_size(len(config.browsers.registry))
 
-    # Load arguments
-    GlobalConfigParser.from_arguments(config, args).load()
+        # Load arguments
+        GlobalConfigParser.from_arguments(config, args).load()
+    TIMINGS.config = time.monotonic() - start
     return config
 
 
-def main(parser: 'ArgumentParser') -> 'ExitCode':
-    args, unknown = parser.parse_known_args()
+def start_tracing(args: 'Namespace', base: Optional['Configuration'] = None):
+    """
+    Enables tracing if asked through the arguments or the environment.
+    :param base: Already loaded configuration files, meaning the imports were done by the daemon before.
+    """
+    destination = args.trace if args.trace is not None else get_trace_destination()
+    if destination is None:
+        return
+    TRACER.enable(destination)
+    if base is None:
+        TRACER.record("imports", IMPORTS_START, IMPORTS_END)
+
+
+def run_rofi_script(argv: list[str], base: Optional['Configuration'] = None) -> 'ExitCode':
+    """
+    Answers a call from rofi, when rofi-search is used as a rofi script mode.
+    Anything printed while handling the call is redirected to stderr,
+    as stdout is read by rofi.
+    :param argv: The arguments given by rofi (the selected row or the custom input).
+    """
+    args, _ = parse_arguments(json.loads(os.environ[SCRIPT_ARGUMENTS_ENV]))
+    start_tracing(args, base)
+    # The script is called as soon as the user acts in the menu
+    if base is not None:
+        TIMINGS.restart()
+    TIMINGS.input = TIMINGS.start
+    TIMINGS.inherit(os.getenv(SCRIPT_TIMINGS_ENV, ""))
+    output = sys.stdout
+    with redirect_stdout(sys.stderr):
+        config = load_config(args, base)
+        menu = ScriptMenu(Application(config, detach=True), os.getenv("ROFI_DATA"))
+        with TRACER.phase("script.call", return_code=int(os.environ["ROFI_RETV"])):
+            payload = menu.handle(int(os.environ["ROFI_RETV"]), argv[0] if len(argv) != 0 else None, os.getenv("ROFI_INFO"))
+    if TIMINGS.browser_launch is not None:
+        TIMINGS.frontend = Path(get_rofi_exec(config.customization.get_frontend())[0]).name
+        save_statistics(config)
+    if payload is not None:
+        output.write(payload)
+    return ExitCode.SUCCESS
+
+
+def run_daemon(args: 'Namespace') -> 'ExitCode':
+    from daemon import Daemon, DaemonException
+
+    daemon = Daemon(
+        lambda: load_file_config(args),
+        lambda base, argv: main(argv, base),
+        debug=args.debug
+    )
+    try:
+        daemon.serve()
+    except DaemonException as e:
+        print(e, file=sys.stderr)
+        return ExitCode.DAEMON_ERROR
+    return ExitCode.SUCCESS
+
+
+def main(argv: Optional[list[str]] = None, base: Optional['Configuration'] = None) -> 'ExitCode':
+    argv = argv if argv is not None else sys.argv[1:]
+    if is_script_call():
+        return run_rofi_script(argv, base)
+
+    args, unknown = parse_arguments(argv)
     if len(unknown) != 0:
         print(f"Unknown parameters: {unknown}", file=sys.stderr)
-
-    config = load_config(args)
-    if args.list_browsers:
-        return print_browsers(config)
-    elif args.list_search_engines:
-        return print_search_engines(config)
-    elif args.make_init_config:
-        return make_init_config()
-
-    app = Application(config)
-    if args.terms:
-        app.search(" ".join(args.terms))
-        return ExitCode.SUCCESS
-    return app.run()
+    start_tracing(args, base)
+    if base is not None:
+        TIMINGS.restart()
+    if args.daemon:
+        return run_daemon(args)
+    if args.stats:
+        return print_statistics(StatisticsStore())
+
+    config = load_config(args, base)
+    try:
+        if args.list_browsers:
+            return print_browsers(config)
+        elif args.list_search_engines:
+            return print_search_engines(config)
+        elif args.make_init_config:
+            return make_init_config()
+
+        if args.batch is not None:
+            return run_batch(Application(config, detach=not args.wait), args.batch)
+        if args.complete is not None:
+            return print_completions(Application(config), args.complete)
+        if args.terms:
+            return Application(config, detach=args.detach).search(" ".join(args.terms))
+        app = Application(config, detach=not args.wait)
+        if config.customization.get_backend() == "script" and supports_script_mode(config.customization.get_frontend()):
+            return app.run_script_mode(argv)
+        return app.run()
+    finally:
+        save_statistics(config)
+        if config.debug:
+            print_cache_statistics()
 
 
 if __name__ == '__main__':
-    sys.exit(main(arguments))
\ No newline at end of file
+    sys.exit(main())
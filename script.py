@@ -0,0 +1,160 @@
+"""
+File containing the rofi script mode backend.
+
+Instead of spawning a new rofi process for every menu, a single
+rofi process is started with rofi-search as a script mode
+(see rofi-script(5)). Rofi calls the script (the client, so the
+daemon is used if it is running) every time an entry is selected
+or a custom keybinding is pressed, and the script answers with
+the rows and options of the next menu.
+The state of the application (current menu, browser, search engine,
+language and privacy) is kept by rofi between calls, in ROFI_DATA.
+The original command line arguments are given to the script through
+the environment, so it loads the same configuration.
+"""
+import json
+import os
+import shlex
+import sys
+from typing import Optional
+
+
+MODE_NAME = "rofi-search"
+SCRIPT_ARGUMENTS_ENV = "ROFI_SEARCH_ARGUMENTS"
+SCRIPT_TIMINGS_ENV = "ROFI_SEARCH_TIMINGS"
+
+SEARCH_MENU = 0
+BROWSERS_MENU = 10
+SEARCH_ENGINES_MENU = 11
+LANGUAGES_MENU = 13
+
+
+def is_script_call() -> bool:
+    return SCRIPT_ARGUMENTS_ENV in os.environ and "ROFI_RETV" in os.environ
+
+
+def get_script_command() -> str:
+    client = os.path.join(os.path.dirname(os.path.realpath(__file__)), "client.py")
+    return shlex.join([sys.executable, client])
+
+
+def get_script_environment(argv: list[str], timings: str) -> dict[str, str]:
+    """
+    :param argv: The command line arguments, given to every call of the script.
+    :param timings: The durations of the launch, stored with the statistics by the call that starts the browser.
+    """
+    return dict(os.environ, **{SCRIPT_ARGUMENTS_ENV: json.dumps(argv), SCRIPT_TIMINGS_ENV: timings})
+
+
+def make_option(name: str, value: str) -> str:
+    return f"\0{name}\x1f{value}"
+
+
+def make_row(text: str, info: str) -> str:
+    return f"{text}\0info\x1f{info}"
+
+
+class ScriptMenu:
+    """
+    Handles one call of the script by rofi.
+    The application is only used for its state and its menus content,
+    it never spawns rofi by itself.
+    """
+
+    def __init__(self, app, data: Optional[str]):
+        self.app = app
+        self.menu = SEARCH_MENU
+        if data:
+            self.restore(json.loads(data))
+
+    def restore(self, state: dict):
+        search_engines = self.app.config.search_engines.registry
+        self.menu = state["menu"]
+        self.app.browser = self.app.config.browsers.registry.get(state["browser"], self.app.browser)
+        self.app.search_engine = search_engines.get(state["search_engine"], self.app.search_engine)
+        self.app.language = state["language"]
+        self.app.private = state["private"]
+        self.app.additional_search_engines = [search_engines[name] for name in state["additional"] if name in search_engines]
+
+    def dump(self) -> str:
+        return json.dumps({
+            "menu": self.menu,
+            "browser": self.app.browser.get_name(),
+            "search_engine": self.app.search_engine.get_name(),
+            "additional": [se.get_name() for se in self.app.additional_search_engines],
+            "language": self.app.language,
+            "private": self.app.private
+        }, separators=(",", ":"))
+
+    def handle(self, return_code: int, selection: Optional[str], info: Optional[str]) -> Optional[str]:
+        """
+        Updates the state from the action of the user.
+        :param return_code: The ROFI_RETV value: 0 on start, 1 for a selected row, 2 for a custom input, 10-28 for custom keybindings.
+        :param selection: The selected row or the custom input.
+        :param info: The info of the selected row.
+        :return: The payload of the next menu, or None to close rofi.
+        """
+        match return_code:
+            case 1 | 2:
+                if self.menu == SEARCH_MENU and return_code == 1 and info:
+                    self.app.search_again(json.loads(info))
+                    return None
+                elif self.menu == SEARCH_MENU:
+                    self.app.search(selection or "")
+                    return None
+                self.select(selection, info)
+                self.menu = SEARCH_MENU
+            case 10 | 11 | 13:
+                self.menu = return_code
+            case 12:
+                self.app.toggle_privacy()
+            case 14:
+                search_engines = self.app.config.search_engines.registry
+                if self.menu == SEARCH_ENGINES_MENU and info in search_engines:
+                    self.app.toggle_additional_search_engine(search_engines[info])
+        return self.render()
+
+    def select(self, selection: Optional[str], info: Optional[str]):
+        browsers = self.app.config.browsers.registry
+        search_engines = self.app.config.search_engines.registry
+        if self.menu == BROWSERS_MENU and info in browsers:
+            self.app.browser = browsers[info]
+        elif self.menu == SEARCH_ENGINES_MENU and info in search_engines:
+            self.app.search_engine = search_engines[info]
+            if self.app.search_engine in self.app.additional_search_engines:
+                self.app.additional_search_engines.remove(self.app.search_engine)
+        elif self.menu == LANGUAGES_MENU and info in self.app.languages.get_codes():
+            self.app.language = info
+        elif self.menu == LANGUAGES_MENU and selection:
+            self.app.language = selection.strip()
+
+    def render(self) -> str:
+        aliases_color = self.app.config.customization.get_aliases_color()
+        rows: list[str] = []
+        active: list[str] = []
+        is_entry_menu = self.menu in (BROWSERS_MENU, SEARCH_ENGINES_MENU)
+        if self.menu == BROWSERS_MENU:
+            prompt, message = "", self.app.get_browser_message()
+            rows = [make_row(b.get_entry(aliases_color), b.get_name()) for b in self.app.get_browsers()]
+        elif self.menu == SEARCH_ENGINES_MENU:
+            prompt, message = "󰖟", self.app.get_search_engine_message()
+            search_engines = self.app.get_search_engines()
+            rows = [make_row(se.get_entry(aliases_color), se.get_name()) for se in search_engines]
+            active = [str(i) for i, se in enumerate(search_engines) if se in self.app.additional_search_engines]
+        elif self.menu == LANGUAGES_MENU:
+            prompt, message = "󰗊", self.app.get_language_message()
+            rows = [self.app.languages.get_payload("script")]
+        else:
+            prompt, message = "", self.app.get_search_message()
+            rows = [make_row(self.app.get_history_entry(record), json.dumps(record)) for record in self.app.get_history()]
+        lines = [
+            make_option("prompt", prompt),
+            make_option("message", message),
+            make_option("markup-rows", "true"),
+            make_option("no-custom", "true" if is_entry_menu else "false"),
+            make_option("use-hot-keys", "true"),
+            make_option("active", ",".join(active)),
+            make_option("data", self.dump())
+        ]
+        lines.extend(rows)
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,229 @@
+"""
+File containing the latency statistics of rofi-search.
+
+Every interactive launch stores the duration of its main phases:
+- startup: from the start of the process (or of the daemon request) until the menus are ready
+- config: loading the configuration
+- first_menu: from the start of the process until the first rofi process is started
+- browser: from the last user input (menu closed) until the browser is started
+Phases that did not happen during a launch are stored as NaN.
+
+Records are kept in a ring buffer file of fixed size: once it is full,
+new records overwrite the oldest ones, so it never grows.
+The file is a header (magic, version, number of slots, next slot, number of records)
+followed by the slots, each a fixed-size binary record.
+"""
+import fcntl
+import math
+import os
+import struct
+import time
+from pathlib import Path
+from typing import Iterable, NamedTuple, Optional
+
+from cache import APP_STATE_DIR
+from tracing import IMPORTS_START
+
+STATISTICS_FILE = APP_STATE_DIR / "latency.bin"
+STATISTICS_SLOTS = 1000
+MAGIC = b"RSLT"
+VERSION = 1
+PHASES = ("startup", "config", "first_menu", "browser")
+PERCENTILES = (50, 95, 99)
+
+HEADER = struct.Struct("<4sIIII")
+RECORD = struct.Struct(f"<d{len(PHASES)}d16s32s")
+
+
+class LaunchRecord(NamedTuple):
+    time: float
+    durations: tuple[float, ...]
+    frontend: str
+    browser: str
+
+    def pack(self) -> bytes:
+        return RECORD.pack(
+            self.time,
+            *self.durations,
+            self.frontend.encode("utf-8")[:16],
+            self.browser.encode("utf-8")[:32]
+        )
+
+    @classmethod
+    def unpack(cls, data: bytes) -> 'LaunchRecord':
+        time_, *durations, frontend, browser = RECORD.unpack(data)
+        return cls(
+            time_,
+            tuple(durations),
+            frontend.rstrip(b"\0").decode("utf-8", "replace"),
+            browser.rstrip(b"\0").decode("utf-8", "replace")
+        )
+
+
+class LaunchTimings:
+    """
+    The timestamps (time.monotonic) of the current launch, always collected, as they are cheap.
+    """
+
+    def __init__(self):
+        self.start = IMPORTS_START
+        self.config: Optional[float] = None
+        self.ready: Optional[float] = None
+        self.first_menu: Optional[float] = None
+        self.input: Optional[float] = None
+        self.browser_launch: Optional[float] = None
+        self.frontend = ""
+        self.browser = ""
+        # The durations measured by the process that opened the menu, when it let this one store the record
+        self.inherited: Optional[tuple[float, ...]] = None
+        self.delegated = False
+
+    def restart(self):
+        """
+        Starts a new launch, inside an already running process (daemon).
+        """
+        self.__init__()
+        self.start = time.monotonic()
+
+    def set_ready(self):
+        if self.ready is None:
+            self.ready = time.monotonic()
+
+    def set_menu_opened(self, frontend: str):
+        if self.first_menu is None:
+            self.first_menu = time.monotonic()
+            self.frontend = frontend
+
+    def set_input(self):
+        self.input = time.monotonic()
+
+    def set_browser_launched(self, browser: str):
+        self.browser_launch = time.monotonic()
+        self.browser = browser
+
+    def is_interactive(self) -> bool:
+        return self.first_menu is not None or self.input is not None
+
+    def delegate(self) -> str:
+        """
+        Lets another process (a rofi script call) store the record of the launch, so that it is stored once.
+        :return: The durations measured until now, to give to the other process.
+        """
+        self.delegated = True
+        return ",".join(str(duration) for duration in self.get_durations()[:-1])
+
+    def inherit(self, durations: str):
+        """
+        Takes over the record of a launch delegated by another process.
+        :param durations: The durations returned by delegate.
+        """
+        try:
+            self.inherited = tuple(float(duration) for duration in durations.split(","))
+        except ValueError:
+            self.inherited = None
+
+    def get_durations(self) -> tuple[float, ...]:
+        def elapsed(start: Optional[float], end: Optional[float]) -> float:
+            return end - start if start is not None and end is not None else math.nan
+
+        browser = elapsed(self.input, self.browser_launch)
+        if self.inherited is not None and len(self.inherited) == len(PHASES) - 1:
+            return (*self.inherited, browser)
+        return (
+            elapsed(self.start, self.ready),
+            self.config if self.config is not None else math.nan,
+            elapsed(self.start, self.first_menu),
+            browser,
+        )
+
+    def get_record(self) -> 'LaunchRecord':
+        return LaunchRecord(time.time(), self.get_durations(), self.frontend, self.browser)
+
+
+class StatisticsStore:
+
+    def __init__(self, file: Path = STATISTICS_FILE, slots: int = STATISTICS_SLOTS):
+        self.file = file
+        self.slots = slots
+
+    def add(self, record: 'LaunchRecord'):
+        """
+        Writes the record in the next slot, overwriting the oldest record if the file is full.
+        The file is locked while it is written, as several launches may end at the same time.
+        Errors are silently ignored, as statistics are not essential.
+        """
+        try:
+            self.file.parent.mkdir(parents=True, exist_ok=True)
+            fd = os.open(self.file, os.O_RDWR | os.O_CREAT, 0o644)
+        except OSError:
+            return
+        with os.fdopen(fd, "r+b") as f:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                slots, next_slot, count = self.read_header(f)
+                f.seek(HEADER.size + next_slot * RECORD.size)
+                f.write(record.pack())
+                f.seek(0)
+                f.write(HEADER.pack(MAGIC, VERSION, slots, (next_slot + 1) % slots, min(count + 1, slots)))
+            except OSError:
+                pass
+
+    def read_header(self, f) -> tuple[int, int, int]:
+        """
+        :return: The number of slots, the next slot to write and the number of records.
+        An empty, corrupted or outdated file is reset.
+        """
+        data = f.read(HEADER.size)
+        if len(data) == HEADER.size:
+            magic, version, slots, next_slot, count = HEADER.unpack(data)
+            if magic == MAGIC and version == VERSION and slots == self.slots and next_slot < slots:
+                return slots, next_slot, count
+        f.truncate(HEADER.size + self.slots * RECORD.size)
+        return self.slots, 0, 0
+
+    def read(self) -> list['LaunchRecord']:
+        """
+        :return: The stored records, oldest first.
+        """
+        try:
+            with self.file.open("rb") as f:
+                data = f.read()
+        except OSError:
+            return []
+        if len(data) < HEADER.size:
+            return []
+        magic, version, slots, next_slot, count = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION or len(data) < HEADER.size + slots * RECORD.size:
+            return []
+        first = (next_slot - count) % slots
+        return [
+            LaunchRecord.unpack(data[HEADER.size + slot * RECORD.size:HEADER.size + (slot + 1) * RECORD.size])
+            for slot in ((first + i) % slots for i in range(count))
+        ]
+
+
+def get_percentile(values: list[float], percent: int) -> float:
+    """
+    :param values: Sorted values.
+    :return: The nearest-rank percentile of the values.
+    """
+    return values[max(0, math.ceil(percent / 100 * len(values)) - 1)]
+
+
+def get_percentiles(records: Iterable['LaunchRecord']) -> dict[str, Optional[tuple[int, list[float]]]]:
+    """
+    :return: For every phase, the number of records it happened in and its percentiles (None if it never happened).
+    """
+    durations: dict[str, list[float]] = {phase: [] for phase in PHASES}
+    for record in records:
+        for phase, duration in zip(PHASES, record.durations):
+            if not math.isnan(duration):
+                durations[phase].append(duration)
+    percentiles: dict[str, Optional[tuple[int, list[float]]]] = {}
+    for phase, values in durations.items():
+        values.sort()
+        percentiles[phase] = (len(values), [get_percentile(values, p) for p in PERCENTILES]) if len(values) != 0 else None
+    return percentiles
+
+
+TIMINGS = LaunchTimings()
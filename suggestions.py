@@ -0,0 +1,177 @@
+"""
+File containing the search suggestions index.
+
+The index is a sorted array of the (lowercase) terms of the history,
+with their frecency scores. Completing a prefix is a binary search
+for the range of terms starting with it, then a selection of the
+best scored terms of that range.
+It is stored in a cache file, already sorted: one line with the
+fingerprint, one line with every score, then one line per terms,
+so loading it only requires to split lines. The cache is keyed on the size and modification time of the
+history file. After every search, a line with the new fingerprint, the score and the terms is appended
+to it (a journal, replayed when loading), and the file is only rewritten once the journal is
+MAX_JOURNAL_SIZE lines long. The file is read and written without newline translation,
+so terms containing a carriage return keep their line.
+"""
+import heapq
+import os
+from bisect import bisect_left
+from pathlib import Path
+from typing import Optional
+
+from cache import APP_CACHE_DIR
+from history import History
+
+SUGGESTIONS_CACHE_FILE = APP_CACHE_DIR / "suggestions.tsv"
+# Number of searches appended to the cache file before it is rewritten
+MAX_JOURNAL_SIZE = 100
+
+
+def get_history_fingerprint(history: 'History') -> str:
+    try:
+        stat = os.stat(history.file)
+    except OSError:
+        return "none"
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+class SuggestionIndex:
+
+    def __init__(self):
+        self.keys: list[str] = []
+        self.terms: list[str] = []
+        self.scores: list[float] = []
+        # Number of searches appended to the cache file since it was written
+        self.journal_size = 0
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    @classmethod
+    def from_scores(cls, scores: dict[str, float]) -> 'SuggestionIndex':
+        index = cls()
+        for key, terms, score in sorted((terms.lower(), terms, score) for terms, score in scores.items()):
+            if "\n" in terms:
+                continue
+            if len(index.keys) != 0 and index.keys[-1] == key:
+                index.scores[-1] += score
+                continue
+            index.keys.append(key)
+            index.terms.append(terms)
+            index.scores.append(score)
+        return index
+
+    @classmethod
+    def from_history(cls, history: 'History') -> 'SuggestionIndex':
+        scores: dict[str, float] = {}
+        for score, record in history.get_scores().values():
+            scores[record["terms"]] = scores.get(record["terms"], 0.0) + score
+        return cls.from_scores(scores)
+
+    @classmethod
+    def load(cls, history: 'History', file: Path = SUGGESTIONS_CACHE_FILE) -> 'SuggestionIndex':
+        """
+        Loads the index from the cache file, or rebuilds it if the history changed.
+        """
+        fingerprint = get_history_fingerprint(history)
+        try:
+            with file.open("r", encoding="utf-8", newline="") as f:
+                header = f.readline().rstrip("\n")
+                scores = f.readline().split()
+                content = f.read()
+        except OSError:
+            header = None
+            scores = []
+            content = ""
+        lines = content[:-1].split("\n") if len(content) != 0 else []
+        journal = lines[len(scores):]
+        if len(journal) != 0:
+            header = journal[-1].partition("\t")[0]
+            del lines[len(scores):]
+            content = "\n".join(lines) + "\n"
+        if header != fingerprint:
+            index = cls.from_history(history)
+            index.save(history, file)
+            return index
+        index = cls()
+        if len(scores) != 0:
+            index.terms = lines
+            index.keys = content[:-1].lower().split("\n")
+            index.scores = list(map(float, scores))
+        if not len(index.terms) == len(index.keys) == len(index.scores):
+            return cls.from_history(history)
+        try:
+            for entry in journal:
+                _, score, terms = entry.split("\t", 2)
+                index.add(terms, float(score))
+        except ValueError:
+            return cls.from_history(history)
+        index.journal_size = len(journal)
+        return index
+
+    def save(self, history: 'History', file: Path = SUGGESTIONS_CACHE_FILE):
+        temporary = file.with_name(f".{file.name}.{os.getpid()}")
+        try:
+            file.parent.mkdir(parents=True, exist_ok=True)
+            with temporary.open("w", encoding="utf-8", newline="") as f:
+                f.write(get_history_fingerprint(history) + "\n")
+                f.write(" ".join(f"{score:.6g}" for score in self.scores) + "\n")
+                f.writelines(f"{terms}\n" for terms in self.terms)
+            os.replace(temporary, file)
+            self.journal_size = 0
+        except OSError:
+            temporary.unlink(missing_ok=True)
+
+    def record(self, terms: str, history: 'History', file: Path = SUGGESTIONS_CACHE_FILE, score: float = 1.0):
+        """
+        Adds the terms of a new search, and appends them to the cache file
+        (which is rewritten instead once the journal is long enough).
+        :param history: The history the search was just added to.
+        """
+        if "\n" in terms:
+            return
+        self.add(terms, score)
+        if self.journal_size >= MAX_JOURNAL_SIZE or not file.exists():
+            self.save(history, file)
+            return
+        try:
+            with file.open("a", encoding="utf-8", newline="") as f:
+                f.write(f"{get_history_fingerprint(history)}\t{score:.6g}\t{terms}\n")
+            self.journal_size += 1
+        except OSError:
+            pass
+
+    def add(self, terms: str, score: float = 1.0):
+        """
+        Adds (or scores once more) the given terms, keeping the index sorted.
+        """
+        if "\n" in terms:
+            return
+        key = terms.lower()
+        position = bisect_left(self.keys, key)
+        if position < len(self.keys) and self.keys[position] == key:
+            self.scores[position] += score
+            return
+        self.keys.insert(position, key)
+        self.terms.insert(position, terms)
+        self.scores.insert(position, score)
+
+    def get_range(self, prefix: str) -> tuple[int, int]:
+        key = prefix.lower()
+        start = bisect_left(self.keys, key)
+        end = bisect_left(self.keys, key + "\U0010ffff", start)
+        return start, end
+
+    def complete(self, prefix: str, limit: Optional[int] = None) -> list[str]:
+        """
+        :param prefix: The beginning of the terms (case-insensitive).
+        :param limit: The maximum number of suggestions.
+        :return: The terms starting with the prefix, best scored first.
+        """
+        start, end = self.get_range(prefix)
+        positions = range(start, end)
+        if limit is None:
+            best = sorted(positions, key=self.scores.__getitem__, reverse=True)
+        else:
+            best = heapq.nlargest(limit, positions, key=self.scores.__getitem__)
+        return [self.terms[position] for position in best]
@@ -0,0 +1,91 @@
+"""
+File containing the latency tracing of rofi-search.
+
+When enabled (--trace, or the ROFI_SEARCH_TRACE environment variable),
+one JSON line is written for every phase of a launch (imports, configuration
+loading, rofi, browser...), with its start and end time in seconds.
+Times come from time.monotonic(), which is shared by all processes,
+so the lines of the rofi script calls can be put side by side.
+
+The environment variable is either "1" to write to stderr,
+or the path of a file to append the lines to (rofi and hotkey
+daemons usually do not show stderr).
+When tracing is disabled, a phase only costs a function call.
+"""
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Optional, TextIO
+
+TRACE_ENV = "ROFI_SEARCH_TRACE"
+STDERR = "-"
+
+# Imports of the application start with this module
+IMPORTS_START = time.monotonic()
+
+NULL_PHASE = nullcontext()
+
+
+class Tracer:
+
+    def __init__(self):
+        self.output: Optional[TextIO] = None
+
+    def is_enabled(self) -> bool:
+        return self.output is not None
+
+    def enable(self, destination: str = STDERR):
+        """
+        Starts writing the phases.
+        The environment variable is set, so the processes started by rofi-search are traced too.
+        :param destination: The path of the file to append to, or "-" for stderr.
+        """
+        if self.output is not None:
+            return
+        if destination == STDERR:
+            self.output = sys.stderr
+        else:
+            self.output = open(destination, "a", encoding="utf-8", buffering=1)
+        os.environ[TRACE_ENV] = destination
+
+    def record(self, phase: str, start: float, end: float, **fields):
+        if self.output is None:
+            return
+        self.output.write(json.dumps({
+            "phase": phase,
+            "pid": os.getpid(),
+            "start": start,
+            "end": end,
+            "duration": end - start,
+            **fields
+        }) + "\n")
+
+    def phase(self, phase: str, **fields):
+        """
+        :param phase: The name of the phase.
+        :param fields: Details about the phase, written with it.
+        :return: A context manager recording the phase, doing nothing if tracing is disabled.
+        """
+        if self.output is None:
+            return NULL_PHASE
+        return self.timed(phase, **fields)
+
+    @contextmanager
+    def timed(self, phase: str, **fields):
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.record(phase, start, time.monotonic(), **fields)
+
+
+def get_trace_destination() -> Optional[str]:
+    value = os.getenv(TRACE_ENV)
+    if not value or value == "0":
+        return None
+    return STDERR if value in ("1", STDERR) else value
+
+
+TRACER = Tracer()